@@ -1,23 +1,54 @@
 import threading
 import time
 
+from r2_timer_service import default_timer_service
+
 class AttentionLayer:
     """
     Manages “attention” triggers when R2 spots something interesting.
     """
 
-    def __init__(self, profile_manager, mood_manager):
+    def __init__(self, profile_manager, mood_manager, timer_service=None):
         self.profile_manager = profile_manager
         self.mood_manager   = mood_manager
+        self._timers        = timer_service or default_timer_service()
 
         self.attention_active = False
         self.attention_target = None
+        self.attention_bbox   = None   # latest (x1, y1, x2, y2) of the target
+        self.attention_confidence = None
         self._lock = threading.Lock()
         self._timer = None
         self._duration = 5  # seconds to hold attention
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """Call callback(state_dict) whenever attention starts or clears."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def get_state(self) -> dict:
+        return {
+            'attention_active':     self.attention_active,
+            'attention_target':     self.attention_target,
+            'attention_bbox':       self.attention_bbox,
+            'attention_confidence': self.attention_confidence
+        }
 
-    def trigger_attention(self, source: str, target_info: str):
-        """Called by camera thread when a target is seen."""
+    def _notify(self):
+        """Run subscriber callbacks; must be called without holding _lock."""
+        state = self.get_state()
+        for callback in list(self._subscribers):
+            try:
+                callback(state)
+            except Exception as e:
+                print(f"[AttentionLayer] Subscriber error: {e}")
+
+    def trigger_attention(self, source: str, target_info):
+        """
+        Called by camera thread when a target is seen.
+        `target_info` is a Target (class_name, bbox, confidence) or a plain label.
+        """
         with self._lock:
             if not self.profile_manager.is_attention_enabled():
                 print(f"[AttentionLayer] Attention disabled in profile → ignoring.")
@@ -26,9 +57,12 @@ class AttentionLayer:
                 print(f"[AttentionLayer] Already in attention mode → ignoring.")
                 return
 
-            print(f"[AttentionLayer] Triggering attention → {source}:{target_info}")
+            label = getattr(target_info, 'class_name', target_info)
+            print(f"[AttentionLayer] Triggering attention → {source}:{label}")
             self.attention_active = True
-            self.attention_target = target_info
+            self.attention_target = label
+            self.attention_bbox   = getattr(target_info, 'bbox', None)
+            self.attention_confidence = getattr(target_info, 'confidence', None)
 
             # Move R2’s mood to CURIOUS
             self.mood_manager.set_mood("CURIOUS")
@@ -37,9 +71,13 @@ class AttentionLayer:
             self.activate_attention_visuals()
 
             # Schedule clear
-            self._timer = threading.Timer(self._duration, self.clear_attention)
-            self._timer.daemon = True
-            self._timer.start()
+            self._timer = self._timers.schedule(self._duration, self.clear_attention)
+        self._notify()
+
+    def update_target_bbox(self, bbox):
+        """Called by the camera thread as the tracked target moves."""
+        if self.attention_active:
+            self.attention_bbox = bbox
 
     def activate_attention_visuals(self):
         """
@@ -53,15 +91,23 @@ class AttentionLayer:
     def clear_attention(self):
         """Clears the attention state and returns R2 to friendly mode."""
         with self._lock:
-            print("[AttentionLayer] Clearing attention, returning to normal.")
-            self.attention_active = False
-            self.attention_target = None
+            self._clear_attention_locked()
+        self._notify()
 
-            # Return mood to FRIENDLY
-            self.mood_manager.set_mood("FRIENDLY")
+    def _clear_attention_locked(self):
+        """clear_attention() body; caller must hold _lock."""
+        print("[AttentionLayer] Clearing attention, returning to normal.")
+        self.attention_active = False
+        self.attention_target = None
+        self.attention_bbox   = None
+        self.attention_confidence = None
+        self._timer = None
 
-            # Turn off visuals
-            self.deactivate_attention_visuals()
+        # Return mood to FRIENDLY
+        self.mood_manager.set_mood("FRIENDLY")
+
+        # Turn off visuals
+        self.deactivate_attention_visuals()
 
     def deactivate_attention_visuals(self):
         """
@@ -76,6 +122,8 @@ class AttentionLayer:
         with self._lock:
             if self._timer:
                 self._timer.cancel()
-            if self.attention_active:
-                print("[AttentionLayer] Force clearing attention.")
-                self.clear_attention()
+            if not self.attention_active:
+                return
+            print("[AttentionLayer] Force clearing attention.")
+            self._clear_attention_locked()
+        self._notify()
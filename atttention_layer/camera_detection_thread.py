@@ -3,58 +3,110 @@
 camera_detection_thread.py
 
 Runs YOLOv8-based detection on the Orin’s camera in a background daemon thread.
-When configured classes are seen, triggers AttentionLayer.trigger_attention().
+The detector backend (ultralytics GPU or ONNX Runtime CPU) is chosen by config.
+Frames come from a shared FrameBus so the camera is opened only once.
+In "motion" pipeline mode a cheap motion gate skips inference on static
+frames and a template tracker follows the target between full detections.
+When an allowed class passes the area/ROI filters, the best target is handed
+to AttentionLayer.trigger_attention().
 """
 
 import threading
 import time
-import cv2
+
+from frame_bus      import FrameBus
+from detector_backends import make_detector
+from detector_process  import ProcessDetector
+from motion_gate    import MotionGate
+from target_tracker import TargetTracker
+from target_selector import TargetSelector
+from rate_controller import RateController
 
 class CameraDetectionThread:
     def __init__(self, profile_manager, attention_layer, camera_index=0,
                  model_path="yolov8n.pt", conf_thresh=0.5, iou_thresh=0.45,
-                 width=320, height=240, fps=5, cooldown=3):
+                 width=320, height=240, fps=5, cooldown=3, frame_bus=None,
+                 pipeline="motion", redetect_interval=1.0, static_redetect=10.0,
+                 detector=None, out_of_process=False,
+                 allowed_classes=("person",), min_box_area=0.01, roi=None,
+                 target_policy="largest", min_fps=0.5, idle_after=5.0):
         """
         :param profile_manager: ProfileManager instance for gating
         :param attention_layer:  AttentionLayer instance to trigger
-        :param camera_index:     OpenCV camera index
+        :param camera_index:     OpenCV camera index (only used without frame_bus)
         :param model_path:       Path to YOLOv8 model (official or custom)
         :param conf_thresh:      Confidence threshold
         :param iou_thresh:       NMS IoU threshold
         :param width, height:    Capture resolution
-        :param fps:              Stream fps (also governs MJPEG sleep)
+        :param fps:              Maximum detection rate (used while people are around)
         :param cooldown:         Seconds between consecutive triggers
+        :param frame_bus:        Shared FrameBus; if None, one is created and owned here
+        :param pipeline:         "full" = YOLO on every frame,
+                                 "motion" = motion-gated + tracker-assisted
+        :param redetect_interval: Max seconds to track before a confirming detection
+        :param static_redetect:  Max seconds without inference on a static scene
+        :param detector:         Detector config dict for make_detector() (e.g.
+                                 {'backend': 'onnx', 'model_path': 'yolov8n.onnx',
+                                  'threads': 4}); None = ultralytics with model_path
+        :param out_of_process:   Run the detector in a supervised worker process fed
+                                 through shared memory
+        :param allowed_classes:  Class names that may trigger attention (None = any)
+        :param min_box_area:     Minimum box area as a fraction of the frame
+        :param roi:              (x1, y1, x2, y2) region of interest in 0–1 coordinates
+        :param target_policy:    "largest" or "closest" (to frame centre)
+        :param min_fps:          Idle detection rate when the hall is empty
+        :param idle_after:       Seconds without activity before slowing down
         """
         self.profile_manager = profile_manager
         self.attention_layer = attention_layer
 
-        self.enabled  = True
+        self.enabled  = profile_manager.is_attention_enabled()
         self.running  = False
         self._stop    = False
 
         self._last_trigger_time = 0
         self._cooldown = cooldown
-        self._frame_delay = 1.0 / fps
-
-        # Load YOLOv8 model
-        print("[CameraDetectionThread] Loading YOLOv8 model (GPU)...")
-        from ultralytics import YOLO
-        self.model = YOLO(model_path)
-        self.model.fuse()  # optimize for inference
-        self.model.conf = conf_thresh
-        self.model.iou  = iou_thresh
-
-        # Open camera
-        print("[CameraDetectionThread] Opening camera...")
-        self.cap = cv2.VideoCapture(camera_index)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH,  width)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.rate = RateController(min_fps=min_fps, max_fps=fps, idle_after=idle_after)
+
+        # Load detector backend
+        config = {'backend': 'ultralytics', 'model_path': model_path}
+        config.update(detector or {})
+        config.setdefault('conf_thresh', conf_thresh)
+        config.setdefault('iou_thresh',  iou_thresh)
+        if out_of_process:
+            # Model loads in the worker on the first frame
+            print(f"[CameraDetectionThread] Using out-of-process detector ({config['backend']})")
+            self.detector = ProcessDetector(config)
+        else:
+            print(f"[CameraDetectionThread] Loading detector ({config['backend']})...")
+            self.detector = make_detector(config)
+
+        # Shared camera frames
+        self._owns_bus  = frame_bus is None
+        self.frame_bus  = frame_bus or FrameBus(camera_index, width, height)
+        self._last_seq  = 0
+
+        self.selector = TargetSelector(allowed_classes, min_box_area, roi, target_policy)
+
+        # Motion gating and tracking between detections
+        self.pipeline           = pipeline
+        self.motion_gate        = MotionGate()
+        self.tracker            = TargetTracker()
+        self._redetect_interval = redetect_interval
+        self._static_redetect   = static_redetect
+        self._last_detect_time  = 0.0
+        self._stats = {'frames': 0, 'inferences': 0, 'skipped_static': 0, 'tracked': 0}
+
+        # Profile-based gating: react to profile switches instead of polling per frame
+        profile_manager.subscribe(self._on_profile_change)
 
     def start(self):
         """Start the detection loop in a daemon thread."""
         if not self.running:
             print("[CameraDetectionThread] Starting detection thread...")
             self.running = True
+            if self._owns_bus:
+                self.frame_bus.start()
             threading.Thread(target=self._loop, daemon=True).start()
 
     def stop(self):
@@ -62,7 +114,18 @@ class CameraDetectionThread:
         print("[CameraDetectionThread] Stopping detection thread...")
         self.running = False
         self._stop    = True
-        self.cap.release()
+        if self._owns_bus:
+            self.frame_bus.stop()
+        if hasattr(self.detector, 'close'):
+            self.detector.close()
+
+    def _on_profile_change(self, snapshot):
+        if not snapshot.attention_enabled and self.enabled:
+            print("[CameraDetectionThread] Profile disallows attention → disabling")
+            self.enabled = False
+        elif snapshot.attention_enabled and not self.enabled:
+            print("[CameraDetectionThread] Profile allows attention → enabling")
+            self.enabled = True
 
     def enable(self):
         """Enable attention triggers (profile may override)."""
@@ -76,45 +139,88 @@ class CameraDetectionThread:
 
     def _loop(self):
         while self.running and not self._stop:
-            # Profile-based gating
-            if not self.profile_manager.is_attention_enabled() and self.enabled:
+            # Lock-free snapshot read: an API enable() can't outlive a
+            # profile that disallows attention until the next profile change
+            if self.enabled and not self.profile_manager.snapshot().attention_enabled:
                 print("[CameraDetectionThread] Profile disallows attention → disabling")
                 self.enabled = False
-            elif self.profile_manager.is_attention_enabled() and not self.enabled:
-                print("[CameraDetectionThread] Profile allows attention → enabling")
-                self.enabled = True
-
             if not self.enabled:
                 time.sleep(0.5)
                 continue
 
-            ret, frame = self.cap.read()
-            if not ret:
-                time.sleep(0.1)
+            started = time.monotonic()
+            # Newest frame only; frames published while inferring are skipped
+            latest = self.frame_bus.wait_for_frame(self._last_seq, timeout=1.0)
+            if latest is None:
                 continue
+            self._last_seq = latest.seq
+            frame = latest.image
+            self.rate.record('capture', time.monotonic() - started)
 
+            activity = False
             try:
-                # Perform inference (returns a Results object)
-                results = self.model(frame, device="cuda:0")[0]
-
-                # Iterate detections
-                for det in results.boxes:
-                    conf = float(det.conf[0])
-                    cls  = int(det.cls[0])
-                    class_name = self.model.names[cls]
-
-                    now = time.time()
-                    if now - self._last_trigger_time < self._cooldown:
-                        continue
-
-                    # Trigger attention on any detected class
-                    print(f"[CameraDetectionThread] Detected '{class_name}' ({conf:.2f})")
-                    self.attention_layer.trigger_attention("camera", class_name)
-                    self._last_trigger_time = now
-
+                activity = self._process(frame)
             except Exception as e:
                 print(f"[CameraDetectionThread] Inference error: {e}")
 
-            time.sleep(self._frame_delay)
-
-
+            # Sleep only what is left of the frame budget at the adapted rate
+            self.rate.update(activity, self.attention_layer.attention_active)
+            time.sleep(self.rate.sleep_time(started))
+
+    def get_pipeline_stats(self) -> dict:
+        """Frame counters, current detection rate and per-stage latency."""
+        return dict(self._stats, pipeline=self.pipeline, rate=self.rate.get_stats())
+
+    def _process(self, frame) -> bool:
+        """Run one pipeline step; returns True if there was motion or a target."""
+        self._stats['frames'] += 1
+        if self.pipeline != "motion":
+            return self._detect(frame)
+
+        now    = time.monotonic()
+        moving = self.motion_gate.update(frame)
+
+        # Follow the current target cheaply until a confirming detection is due
+        if self.tracker.active and now - self._last_detect_time < self._redetect_interval:
+            if self.tracker.update(frame):
+                self._stats['tracked'] += 1
+                self.attention_layer.update_target_bbox(self.tracker.bbox)
+                return True
+
+        # Nothing moved and nothing to track → skip inference (with a periodic safety check)
+        if not moving and not self.tracker.active \
+                and now - self._last_detect_time < self._static_redetect:
+            self._stats['skipped_static'] += 1
+            return False
+
+        return self._detect(frame) or moving
+
+    def _detect(self, frame) -> bool:
+        """Full detection pass; seeds the tracker with the selected target.
+        Returns True if a target was found."""
+        self._stats['inferences'] += 1
+        t0 = self._last_detect_time = time.monotonic()
+
+        # Perform inference (same Detections record for every backend)
+        dets = self.detector.detect(frame)
+        t1   = time.monotonic()
+        self.rate.record('inference', t1 - t0)
+
+        target = self.selector.select(dets, frame.shape)
+        if target is None:
+            self.tracker.reset()
+            self.rate.record('postprocess', time.monotonic() - t1)
+            return False
+
+        self.tracker.init(frame, target.bbox)
+        self.attention_layer.update_target_bbox(target.bbox)
+
+        self.rate.record('postprocess', time.monotonic() - t1)
+
+        now = time.time()
+        if now - self._last_trigger_time < self._cooldown:
+            return True
+        print(f"[CameraDetectionThread] Detected '{target.class_name}' ({target.confidence:.2f})")
+        self.attention_layer.trigger_attention("camera", target)
+        self._last_trigger_time = now
+        return True
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+detector_backends.py
+
+Pluggable object detectors for CameraDetectionThread. Every backend returns
+the same Detections record so the attention pipeline doesn't care whether
+YOLOv8 ran through ultralytics on the GPU or through ONNX Runtime on a CPU.
+
+Benchmark a backend on any Linux box:
+    python3 detector_backends.py --backend onnx --model yolov8n.onnx --threads 4
+"""
+
+import ast
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# boxes:   (N, 4) float32 xyxy in frame pixels
+# confs:   (N,)   float32
+# classes: (N,)   int32
+# names:   {class_id: class_name}
+Detections = namedtuple('Detections', ['boxes', 'confs', 'classes', 'names'])
+
+
+def _empty(names) -> Detections:
+    return Detections(np.zeros((0, 4), np.float32), np.zeros(0, np.float32),
+                      np.zeros(0, np.int32), names)
+
+
+class UltralyticsDetector:
+    """YOLOv8 through the ultralytics package (GPU on the Orin)."""
+
+    def __init__(self, model_path="yolov8n.pt", conf_thresh=0.5, iou_thresh=0.45,
+                 device="cuda:0"):
+        print(f"[UltralyticsDetector] Loading {model_path} on {device}...")
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.model.fuse()  # optimize for inference
+        self.conf   = conf_thresh
+        self.iou    = iou_thresh
+        self.device = device
+        self.names  = dict(self.model.names)
+
+    def detect(self, frame) -> Detections:
+        results = self.model(frame, device=self.device, conf=self.conf,
+                             iou=self.iou, verbose=False)[0]
+        boxes = results.boxes
+        if boxes is None or len(boxes) == 0:
+            return _empty(self.names)
+        return Detections(boxes.xyxy.cpu().numpy().astype(np.float32),
+                          boxes.conf.cpu().numpy().astype(np.float32),
+                          boxes.cls.cpu().numpy().astype(np.int32),
+                          self.names)
+
+
+class OnnxDetector:
+    """YOLOv8 exported to ONNX, run with ONNX Runtime on the CPU."""
+
+    def __init__(self, model_path="yolov8n.onnx", conf_thresh=0.5, iou_thresh=0.45,
+                 input_size=None, threads=0, int8=False, providers=None):
+        """
+        :param model_path: FP32 .onnx export (`yolo export format=onnx`)
+        :param input_size: Square network input; None = use the model's fixed size
+        :param threads:    intra-op threads (0 = ONNX Runtime default)
+        :param int8:       Load the `<model>.int8.onnx` sibling made by quantize_model()
+        :param providers:  ONNX Runtime execution providers (default CPU)
+        """
+        import onnxruntime as ort
+
+        if int8:
+            model_path = int8_model_path(model_path)
+        print(f"[OnnxDetector] Loading {model_path} ({threads or 'default'} threads)...")
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, sess_options=opts,
+                                            providers=providers or ["CPUExecutionProvider"])
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+
+        fixed = inp.shape[2] if isinstance(inp.shape[2], int) else None
+        if input_size and fixed and input_size != fixed:
+            print(f"[OnnxDetector] Model is fixed at {fixed}px; ignoring input_size={input_size}")
+        self.input_size = fixed or input_size or 640
+
+        self.conf = conf_thresh
+        self.iou  = iou_thresh
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(meta['names']) if 'names' in meta else {}
+
+    def _preprocess(self, frame):
+        """Letterbox to input_size; returns NCHW float32 blob, scale and padding."""
+        h, w = frame.shape[:2]
+        size  = self.input_size
+        scale = min(size / w, size / h)
+        nw, nh = int(round(w * scale)), int(round(h * scale))
+        pad_x, pad_y = (size - nw) // 2, (size - nh) // 2
+        canvas = np.full((size, size, 3), 114, np.uint8)
+        canvas[pad_y:pad_y + nh, pad_x:pad_x + nw] = cv2.resize(frame, (nw, nh))
+        blob = cv2.dnn.blobFromImage(canvas, 1 / 255.0, swapRB=True)
+        return blob, scale, pad_x, pad_y
+
+    def detect(self, frame) -> Detections:
+        blob, scale, pad_x, pad_y = self._preprocess(frame)
+        out = self.session.run(None, {self.input_name: blob})[0]
+
+        # YOLOv8 head: (1, 4 + num_classes, anchors) → (anchors, 4 + num_classes)
+        preds  = out[0].T
+        scores = preds[:, 4:]
+        classes = scores.argmax(axis=1).astype(np.int32)
+        confs   = scores[np.arange(len(scores)), classes]
+        keep    = confs >= self.conf
+        if not keep.any():
+            return _empty(self.names)
+        preds, confs, classes = preds[keep], confs[keep], classes[keep]
+
+        # cx,cy,w,h in network pixels → x1,y1,x2,y2 in frame pixels
+        cx, cy, bw, bh = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+        boxes = np.stack([cx - bw / 2 - pad_x, cy - bh / 2 - pad_y,
+                          cx + bw / 2 - pad_x, cy + bh / 2 - pad_y], axis=1) / scale
+
+        # Per-class NMS: offset each class into its own coordinate range
+        shifted = boxes + (classes[:, None] * 4096.0)
+        xywh = np.concatenate([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]], axis=1)
+        idx = cv2.dnn.NMSBoxes(xywh.tolist(), confs.tolist(), self.conf, self.iou)
+        idx = np.array(idx, dtype=np.int64).reshape(-1)
+        return Detections(boxes[idx].astype(np.float32), confs[idx].astype(np.float32),
+                          classes[idx], self.names)
+
+
+def int8_model_path(model_path: str) -> str:
+    """`yolov8n.onnx` → `yolov8n.int8.onnx`."""
+    stem = model_path[:-5] if model_path.endswith('.onnx') else model_path
+    return f"{stem}.int8.onnx"
+
+
+def quantize_model(model_path: str) -> str:
+    """Write a dynamically INT8-quantized copy of an ONNX model; returns its path."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    out = int8_model_path(model_path)
+    quantize_dynamic(model_path, out, weight_type=QuantType.QUInt8)
+    print(f"[detector_backends] Wrote {out}")
+    return out
+
+
+BACKENDS = {
+    'ultralytics': UltralyticsDetector,
+    'onnx':        OnnxDetector,
+}
+
+def make_detector(config: dict):
+    """
+    Build a detector from a config dict, e.g.
+      {'backend': 'onnx', 'model_path': 'yolov8n.onnx', 'threads': 4, 'input_size': 320}
+    """
+    config  = dict(config)
+    backend = config.pop('backend', 'ultralytics')
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{backend}'")
+    return BACKENDS[backend](**config)
+
+
+if __name__ == '__main__':
+    import argparse
+    ap = argparse.ArgumentParser(description="Benchmark a detector backend")
+    ap.add_argument('--backend', default='onnx', choices=sorted(BACKENDS))
+    ap.add_argument('--model', default='yolov8n.onnx')
+    ap.add_argument('--threads', type=int, default=0)
+    ap.add_argument('--input-size', type=int, default=None)
+    ap.add_argument('--int8', action='store_true')
+    ap.add_argument('--quantize', action='store_true', help="create the INT8 model first")
+    ap.add_argument('--image', default=None, help="image to run on (default: noise)")
+    ap.add_argument('--runs', type=int, default=50)
+    args = ap.parse_args()
+
+    if args.quantize:
+        quantize_model(args.model)
+    cfg = {'backend': args.backend, 'model_path': args.model}
+    if args.backend == 'onnx':
+        cfg.update(threads=args.threads, input_size=args.input_size, int8=args.int8)
+    det = make_detector(cfg)
+
+    frame = cv2.imread(args.image) if args.image else \
+        np.random.randint(0, 255, (240, 320, 3), np.uint8)
+    det.detect(frame)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(args.runs):
+        result = det.detect(frame)
+    dt = (time.perf_counter() - t0) / args.runs
+    print(f"{args.backend}: {dt * 1000:.1f} ms/frame ({1 / dt:.1f} fps), "
+          f"{len(result.boxes)} detections on last frame")
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+detector_process.py
+
+Runs a detector backend in a separate process so YOLO pre/post-processing
+never competes with the Flask handlers and event loop for the GIL.
+Frames are handed over through multiprocessing.shared_memory (the worker
+reads a zero-copy numpy view); detections come back over a local socket as
+one compact (N, 6) float32 array. A dead or hung worker is restarted.
+
+The worker is a fresh interpreter running this file, so it never re-executes
+the API's module-level startup the way a multiprocessing "spawn" child would.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from detector_backends import Detections, make_detector
+
+
+def _worker_main(config, shm_name, shape, conn):
+    """Worker process: attach to the frame buffer and answer detect requests."""
+    # The parent owns the segment; don't let this process's tracker unlink it
+    from multiprocessing import resource_tracker
+    shm   = shared_memory.SharedMemory(name=shm_name)
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    frame = None
+    try:
+        frame    = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        detector = make_detector(config)
+        detector.detect(frame)   # warm-up so the first real frame isn't a timeout
+        conn.send(('ready', detector.names))
+        while True:
+            seq = conn.recv()
+            if seq is None:
+                break
+            d = detector.detect(frame)
+            # x1, y1, x2, y2, conf, cls per row
+            packed = np.concatenate([d.boxes, d.confs[:, None],
+                                     d.classes[:, None].astype(np.float32)], axis=1)
+            conn.send((seq, packed.astype(np.float32)))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del frame
+        shm.close()
+
+
+class ProcessDetector:
+    def __init__(self, config: dict, timeout=2.0, startup_timeout=120.0, restart_delay=1.0):
+        """
+        :param config:          make_detector() config for the worker's backend
+        :param timeout:         Seconds to wait for one detection before restarting
+        :param startup_timeout: Seconds to wait for the worker to load its model
+        :param restart_delay:   Minimum seconds between worker restarts
+        """
+        self.config           = dict(config)
+        self._timeout         = timeout
+        self._startup_timeout = startup_timeout
+        self._restart_delay   = restart_delay
+
+        self._proc  = None
+        self._conn  = None
+        self._sock_dir = None
+        self._shm   = None
+        self._view  = None
+        self._shape = None
+        self._seq   = 0
+        self._last_start = 0.0
+
+        self.names    = {}
+        self.restarts = 0
+
+    def _empty(self) -> Detections:
+        return Detections(np.zeros((0, 4), np.float32), np.zeros(0, np.float32),
+                          np.zeros(0, np.int32), self.names)
+
+    def _start(self, shape):
+        """(Re)create the shared buffer if the frame shape changed and spawn a worker."""
+        self._kill()
+        if self._shape != shape:
+            self._release_shm()
+            nbytes = int(np.prod(shape))
+            self._shm   = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._view  = np.ndarray(shape, dtype=np.uint8, buffer=self._shm.buf)
+            self._shape = shape
+
+        print("[ProcessDetector] Starting detector worker...")
+        self._last_start = time.monotonic()
+        authkey = os.urandom(16)
+        self._sock_dir = tempfile.mkdtemp(prefix='r2det-')
+        address = os.path.join(self._sock_dir, 'sock')
+        env = dict(os.environ, R2_DETECTOR_AUTHKEY=authkey.hex(),
+                   PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+        self._proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), address, self._shm.name,
+             json.dumps(list(shape)), json.dumps(self.config)], env=env)
+
+        # Worker listens before loading its model; connect as soon as it is up
+        deadline = time.monotonic() + self._startup_timeout
+        while self._conn is None:
+            if self._proc.poll() is not None or time.monotonic() > deadline:
+                print("[ProcessDetector] Worker failed to start")
+                self._kill()
+                return
+            try:
+                self._conn = Client(address, family='AF_UNIX', authkey=authkey)
+            except (FileNotFoundError, ConnectionRefusedError):
+                time.sleep(0.05)
+
+        if not self._conn.poll(max(0.0, deadline - time.monotonic())):
+            print("[ProcessDetector] Worker failed to load its model in time")
+            self._kill()
+            return
+        try:
+            _, self.names = self._conn.recv()
+        except EOFError:
+            print("[ProcessDetector] Worker exited during startup")
+            self._kill()
+
+    def _kill(self):
+        if self._proc is not None:
+            if self._proc.poll() is None:
+                self._proc.terminate()
+            try:
+                self._proc.wait(timeout=1.0)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+        if self._conn is not None:
+            self._conn.close()
+        self._proc, self._conn = None, None
+        if self._sock_dir:
+            shutil.rmtree(self._sock_dir, ignore_errors=True)
+            self._sock_dir = None
+
+    def _release_shm(self):
+        if self._shm is not None:
+            self._view = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm, self._shape = None, None
+
+    def _alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None and self._conn is not None
+
+    def detect(self, frame) -> Detections:
+        """Same contract as the in-process backends."""
+        if not self._alive() or frame.shape != self._shape:
+            if self._proc is not None or self._shape is not None:
+                # Crash/restart path: don't hammer a worker that can't come up
+                if time.monotonic() - self._last_start < self._restart_delay:
+                    return self._empty()
+                self.restarts += 1
+                print(f"[ProcessDetector] Restarting worker (restart #{self.restarts})")
+            self._start(frame.shape)
+            if not self._alive():
+                return self._empty()
+
+        # The only copy: camera frame → shared buffer. Safe because the worker
+        # is idle until it receives the sequence number below.
+        np.copyto(self._view, frame)
+        self._seq += 1
+        try:
+            self._conn.send(self._seq)
+            while self._conn.poll(self._timeout):
+                seq, packed = self._conn.recv()
+                if seq == self._seq:
+                    return Detections(packed[:, :4], packed[:, 4],
+                                      packed[:, 5].astype(np.int32), self.names)
+        except (EOFError, OSError):
+            pass
+        print("[ProcessDetector] Worker timed out or died → will restart")
+        self._kill()
+        return self._empty()
+
+    def close(self):
+        """Stop the worker and free the shared buffer."""
+        if self._alive():
+            try:
+                self._conn.send(None)
+                self._proc.wait(timeout=2.0)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        self._kill()
+        self._release_shm()
+
+
+if __name__ == '__main__':
+    # Worker entry point: detector_process.py <address> <shm_name> <shape> <config>
+    address, shm_name, shape, config = sys.argv[1:5]
+    authkey = bytes.fromhex(os.environ['R2_DETECTOR_AUTHKEY'])
+    with Listener(address, family='AF_UNIX', authkey=authkey) as listener:
+        conn = listener.accept()
+    _worker_main(json.loads(config), shm_name, tuple(json.loads(shape)), conn)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+frame_bus.py
+
+Owns the single cv2.VideoCapture for the Orin's camera and publishes the
+latest frames into a small ring buffer. The YOLO loop, the /video_feed
+stream and any other consumer read from the bus instead of opening the
+device themselves, so the camera is only read and decoded once.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+# seq:       monotonically increasing frame counter (starts at 1)
+# timestamp: time.monotonic() when the frame was captured
+# image:     the decoded BGR frame — shared by all consumers, treat as read-only
+Frame = namedtuple('Frame', ['seq', 'timestamp', 'image'])
+
+
+class FrameBus:
+    def __init__(self, camera_index=0, width=320, height=240, buffer_size=4,
+                 retry_delay=0.1):
+        """
+        :param camera_index:  OpenCV camera index
+        :param width, height: Capture resolution
+        :param buffer_size:   Number of recent frames kept in the ring buffer
+        :param retry_delay:   Seconds to back off after a failed read
+        """
+        self.camera_index = camera_index
+        self.width        = width
+        self.height       = height
+
+        self.running  = False
+        self._retry_delay = retry_delay
+
+        self._ring = [None] * max(1, buffer_size)
+        self._seq  = 0
+        self._cond = threading.Condition()
+
+        # Opened by the capture thread: VideoCapture can block for seconds
+        self.cap = None
+
+    def start(self):
+        """Start the capture loop in a daemon thread."""
+        if not self.running:
+            print("[FrameBus] Starting capture thread...")
+            self.running = True
+            threading.Thread(target=self._loop, daemon=True).start()
+
+    def stop(self):
+        """Stop capturing and wake any waiting readers; the camera is released
+        by the capture thread."""
+        print("[FrameBus] Stopping capture thread...")
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+
+    @property
+    def opened(self) -> bool:
+        """True once the camera device has been opened successfully."""
+        return self.cap is not None and self.cap.isOpened()
+
+    def _loop(self):
+        print("[FrameBus] Opening camera...")
+        cap = cv2.VideoCapture(self.camera_index)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH,  self.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self.cap = cap
+        try:
+            while self.running:
+                ret, image = cap.read()
+                if not ret:
+                    time.sleep(self._retry_delay)
+                    continue
+                self._publish(image)
+        finally:
+            cap.release()
+
+    def _publish(self, image):
+        with self._cond:
+            self._seq += 1
+            frame = Frame(self._seq, time.monotonic(), image)
+            self._ring[self._seq % len(self._ring)] = frame
+            self._cond.notify_all()
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the most recently published frame (0 = none yet)."""
+        return self._seq
+
+    def latest(self):
+        """Return the newest Frame, or None if nothing has been captured yet."""
+        with self._cond:
+            if self._seq == 0:
+                return None
+            return self._ring[self._seq % len(self._ring)]
+
+    def get(self, seq: int):
+        """Return the Frame with sequence number `seq` if it is still buffered."""
+        with self._cond:
+            if seq <= 0 or seq > self._seq or self._seq - seq >= len(self._ring):
+                return None
+            return self._ring[seq % len(self._ring)]
+
+    def wait_for_frame(self, after_seq: int = 0, timeout: float = 1.0):
+        """
+        Block until a frame newer than `after_seq` is published and return it.
+        Returns None on timeout or when the bus is stopped.
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                    lambda: self._seq > after_seq or not self.running, timeout):
+                return None
+            if self._seq <= after_seq:
+                return None
+            return self._ring[self._seq % len(self._ring)]
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+motion_gate.py
+
+Cheap frame-differencing motion detector used to skip YOLO inference on
+static frames. Works on a small blurred grayscale copy of each frame against
+a running-average background.
+"""
+
+import cv2
+
+class MotionGate:
+    def __init__(self, scale_width=80, threshold=25, min_changed=0.01, learning_rate=0.05):
+        """
+        :param scale_width:   Width frames are downscaled to before differencing
+        :param threshold:     Per-pixel grayscale difference counted as change
+        :param min_changed:   Fraction of changed pixels that counts as motion
+        :param learning_rate: Background adaptation rate (0–1)
+        """
+        self._scale_width  = scale_width
+        self._threshold    = threshold
+        self._min_changed  = min_changed
+        self._alpha        = learning_rate
+        self._background   = None
+        self.changed_ratio = 0.0
+
+    def reset(self):
+        """Forget the background (e.g. after the camera moved)."""
+        self._background = None
+
+    def update(self, frame) -> bool:
+        """Feed a BGR frame; return True if it differs enough from the background."""
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self._scale_width, max(1, h * self._scale_width // w)),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        if self._background is None:
+            self._background = gray.astype('float32')
+            self.changed_ratio = 1.0
+            return True
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        _, mask = cv2.threshold(diff, self._threshold, 255, cv2.THRESH_BINARY)
+        self.changed_ratio = cv2.countNonZero(mask) / float(mask.size)
+        cv2.accumulateWeighted(gray, self._background, self._alpha)
+        return self.changed_ratio >= self._min_changed
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+rate_controller.py
+
+Adaptive detection-rate controller for CameraDetectionThread. Measures
+per-stage latency (capture, inference, post-process), jumps to the maximum
+rate on activity, decays towards a near-idle rate when the scene is empty,
+and backs off when the CPU/GPU is saturated. The sleep after each iteration
+is the remainder of the frame budget, so the actual rate tracks the target.
+"""
+
+import os
+import time
+
+# Jetson exposes GPU utilisation (0–1000) here
+GPU_LOAD_PATHS = ("/sys/devices/gpu.0/load", "/sys/devices/platform/gpu.0/load")
+
+
+class RateController:
+    def __init__(self, min_fps=0.5, max_fps=10.0, idle_after=5.0, decay=0.8,
+                 high_load=0.9, load_check_interval=1.0, alpha=0.2):
+        """
+        :param min_fps, max_fps:    Detection rate bounds
+        :param idle_after:          Seconds without activity before slowing down
+        :param decay:               Per-iteration rate multiplier while idle
+        :param high_load:           CPU/GPU load (0–1) above which the rate is halved
+        :param load_check_interval: Seconds between load samples
+        :param alpha:               Smoothing factor for stage latencies
+        """
+        self.min_fps    = min_fps
+        self.max_fps    = max_fps
+        self.idle_after = idle_after
+        self.decay      = decay
+        self.high_load  = high_load
+        self._load_interval = load_check_interval
+        self._alpha     = alpha
+
+        self.fps            = max_fps
+        self.stage_ms       = {}
+        self.cpu_load       = 0.0
+        self.gpu_load       = None
+        self._last_activity = time.monotonic()
+        self._last_load     = 0.0
+        self._gpu_path      = next((p for p in GPU_LOAD_PATHS if os.path.exists(p)), None)
+
+    def record(self, stage: str, seconds: float):
+        """Fold one stage latency sample into its moving average."""
+        ms   = seconds * 1000.0
+        prev = self.stage_ms.get(stage)
+        self.stage_ms[stage] = ms if prev is None else prev + self._alpha * (ms - prev)
+
+    def _sample_load(self, now: float):
+        if now - self._last_load < self._load_interval:
+            return
+        self._last_load = now
+        try:
+            self.cpu_load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        except OSError:
+            self.cpu_load = 0.0
+        if self._gpu_path:
+            try:
+                with open(self._gpu_path) as f:
+                    self.gpu_load = int(f.read().strip()) / 1000.0
+            except (OSError, ValueError):
+                self.gpu_load = None
+
+    def update(self, activity: bool, attention_active: bool = False) -> float:
+        """Pick the rate for the next iteration; returns the new fps."""
+        now = time.monotonic()
+        self._sample_load(now)
+
+        if activity or attention_active:
+            # Fast attack: someone is approaching → full rate
+            self._last_activity = now
+            fps = self.max_fps
+        elif now - self._last_activity < self.idle_after:
+            fps = self.fps
+        else:
+            # Slow release towards the idle duty cycle
+            fps = self.fps * self.decay
+
+        overloaded = self.cpu_load > self.high_load or \
+            (self.gpu_load is not None and self.gpu_load > self.high_load)
+        if overloaded:
+            fps = min(fps, self.max_fps / 2.0)
+
+        self.fps = max(self.min_fps, min(self.max_fps, fps))
+        return self.fps
+
+    def sleep_time(self, iteration_start: float) -> float:
+        """Seconds left in this iteration's frame budget."""
+        return max(0.0, 1.0 / self.fps - (time.monotonic() - iteration_start))
+
+    def get_stats(self) -> dict:
+        return {
+            'fps':      round(self.fps, 2),
+            'stage_ms': {k: round(v, 2) for k, v in self.stage_ms.items()},
+            'cpu_load': round(self.cpu_load, 2),
+            'gpu_load': self.gpu_load
+        }
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+target_selector.py
+
+Vectorized post-processing of a Detections record: filters boxes by class
+allow-list, minimum area and region of interest, then picks the single best
+attention target in one numpy pass.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+# class_name: detector class label
+# bbox:       (x1, y1, x2, y2) in frame pixels
+# confidence: detector score
+Target = namedtuple('Target', ['class_name', 'bbox', 'confidence'])
+
+
+class TargetSelector:
+    def __init__(self, allowed_classes=("person",), min_area=0.01, roi=None,
+                 policy="largest"):
+        """
+        :param allowed_classes: Class names that may draw attention (None = any)
+        :param min_area:        Minimum box area as a fraction of the frame
+        :param roi:             (x1, y1, x2, y2) in 0–1 frame coordinates; a box's
+                                centre must fall inside it (None = whole frame)
+        :param policy:          "largest" box or the one "closest" to frame centre
+        """
+        self.allowed_classes = set(allowed_classes) if allowed_classes else None
+        self.min_area = min_area
+        self.roi      = roi
+        self.policy   = policy
+        self._names_id  = None   # id() of the names dict the cache was built for
+        self._allowed_ids = None
+
+    def _allowed(self, names):
+        """Allowed class ids, cached per detector names mapping."""
+        if id(names) != self._names_id:
+            self._names_id = id(names)
+            self._allowed_ids = np.array(
+                [i for i, n in names.items() if n in self.allowed_classes], np.int32)
+        return self._allowed_ids
+
+    def select(self, dets, frame_shape):
+        """Return the best Target in `dets`, or None if nothing passes the filters."""
+        if len(dets.confs) == 0:
+            return None
+        h, w = frame_shape[:2]
+        boxes = dets.boxes
+
+        keep = np.ones(len(boxes), bool)
+        if self.allowed_classes is not None:
+            keep &= np.isin(dets.classes, self._allowed(dets.names))
+
+        bw = boxes[:, 2] - boxes[:, 0]
+        bh = boxes[:, 3] - boxes[:, 1]
+        area = bw * bh / float(w * h)
+        keep &= area >= self.min_area
+
+        cx = (boxes[:, 0] + boxes[:, 2]) / (2.0 * w)
+        cy = (boxes[:, 1] + boxes[:, 3]) / (2.0 * h)
+        if self.roi is not None:
+            rx1, ry1, rx2, ry2 = self.roi
+            keep &= (cx >= rx1) & (cx <= rx2) & (cy >= ry1) & (cy <= ry2)
+
+        if not keep.any():
+            return None
+        if self.policy == "closest":
+            score = -((cx - 0.5) ** 2 + (cy - 0.5) ** 2)
+        else:
+            score = area
+        best = int(np.argmax(np.where(keep, score, -np.inf)))
+
+        cls = int(dets.classes[best])
+        return Target(dets.names.get(cls, str(cls)),
+                      tuple(float(v) for v in boxes[best]),
+                      float(dets.confs[best]))
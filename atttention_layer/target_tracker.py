@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+target_tracker.py
+
+Lightweight template-matching tracker that follows the attention target
+between full YOLO detections. Only searches a window around the last known
+box, so an update costs a fraction of an inference.
+"""
+
+import cv2
+
+class TargetTracker:
+    def __init__(self, search_margin=0.5, min_score=0.6):
+        """
+        :param search_margin: Search window padding as a fraction of box size
+        :param min_score:     Normalised match score below which the track is lost
+        """
+        self._margin    = search_margin
+        self._min_score = min_score
+        self._template  = None
+        self.bbox       = None   # (x1, y1, x2, y2) in pixels
+        self.score      = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self._template is not None
+
+    def init(self, frame, bbox):
+        """Start tracking `bbox` (x1, y1, x2, y2) in `frame`."""
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = [int(v) for v in bbox]
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(w, x2), min(h, y2)
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            self.reset()
+            return
+        self._template = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+        self.bbox  = (x1, y1, x2, y2)
+        self.score = 1.0
+
+    def reset(self):
+        self._template = None
+        self.bbox      = None
+        self.score     = 0.0
+
+    def update(self, frame) -> bool:
+        """Locate the target in `frame`; returns False (and resets) if lost."""
+        if not self.active:
+            return False
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = self.bbox
+        bw, bh = x2 - x1, y2 - y1
+        mx, my = int(bw * self._margin), int(bh * self._margin)
+        sx1, sy1 = max(0, x1 - mx), max(0, y1 - my)
+        sx2, sy2 = min(w, x2 + mx), min(h, y2 + my)
+        if sx2 - sx1 < bw or sy2 - sy1 < bh:
+            self.reset()
+            return False
+
+        window = cv2.cvtColor(frame[sy1:sy2, sx1:sx2], cv2.COLOR_BGR2GRAY)
+        result = cv2.matchTemplate(window, self._template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (dx, dy) = cv2.minMaxLoc(result)
+        self.score = score
+        if score < self._min_score:
+            self.reset()
+            return False
+        self.bbox = (sx1 + dx, sy1 + dy, sx1 + dx + bw, sy1 + dy + bh)
+        return True
@@ -1,79 +1,91 @@
 #!/usr/bin/env python3
 """
 CinematicManager:
-  Runs pre-defined “cinematic” sequences (sound + panel movements + logic text)
+  Runs “cinematic” sequences (sound + panel movements + logic text)
   when triggered by the event stack or QA module.
+  Sequences are declarative timelines loaded from the cinematics/ directory
+  and played by a TimelinePlayer with millisecond cue offsets.
 """
 
+from pathlib import Path
+
+from timeline_player import TimelinePlayer, load_timelines
+
+TIMELINE_DIR = Path(__file__).resolve().parent.parent / "cinematics"
+
 class CinematicManager:
-    def __init__(self, profile_manager, sound_driver=None, panel_driver=None):
+    def __init__(self, profile_manager, sound_driver=None, panel_driver=None,
+                 logic_driver=None, timeline_dir=TIMELINE_DIR):
         self.profile_manager = profile_manager
         self.sound_driver    = sound_driver
         self.panel_driver    = panel_driver
+        self.logic_driver    = logic_driver
+
+        # Cue target name → driver
+        self.targets = {
+            'sound':  sound_driver,
+            'panels': panel_driver,
+            'logic':  logic_driver
+        }
 
-        # Pre-approved sequences
-        self.allowed_sequences = [
-            'Leia_Message',
-            'Vader_Entrance',
-            'Jawa_Panic',
-            'Vader_Encounter'  # custom example
-        ]
+        self.timeline_dir = Path(timeline_dir)
+        self.timelines    = {}
+        self.player       = TimelinePlayer(self._resolve_cue)
+        self.reload_timelines()
 
-    def run_cinematic_sequence(self, sequence_name: str):
+    @property
+    def allowed_sequences(self):
+        """Names of all loaded timelines."""
+        return list(self.timelines)
+
+    def reload_timelines(self):
+        """(Re)load every timeline file from timeline_dir."""
+        self.timelines = load_timelines(self.timeline_dir)
+        print(f"[CinematicManager] Loaded {len(self.timelines)} timelines from {self.timeline_dir}")
+
+    def run_cinematic_sequence(self, sequence_name: str, wait: bool = False):
         """Trigger a cinematic if the current profile allows it."""
         if not self.profile_manager.is_cinematic_enabled():
             print(f"[CinematicManager] Cinematics disabled → skipping '{sequence_name}'")
             return
 
-        if sequence_name not in self.allowed_sequences:
+        timeline = self.timelines.get(sequence_name)
+        if timeline is None:
             print(f"[CinematicManager] Unknown sequence: '{sequence_name}'")
             return
 
         print(f"[CinematicManager] Running sequence: {sequence_name}")
+        self.player.play(timeline)
+        if wait:
+            self.player.wait()
 
-        if sequence_name == 'Leia_Message':
-            self._leia_message()
-        elif sequence_name == 'Vader_Entrance':
-            self._vader_entrance()
-        elif sequence_name == 'Jawa_Panic':
-            self._jawa_panic()
-        elif sequence_name == 'Vader_Encounter':
-            self._vader_encounter()
-
-    def _leia_message(self):
-        print("[Cinematic] Leia Message")
-        if self.sound_driver:
-            self.sound_driver.play_mp3('0001_leia_message.mp3')
-        if self.panel_driver:
-            self.panel_driver.move_panels('scroll')    # example mode
-        self.display_logic_text("Leia Organa speaks...")
-
-    def _vader_entrance(self):
-        print("[Cinematic] Vader Entrance")
-        if self.sound_driver:
-            self.sound_driver.play_mp3('0002_vader_entrance.mp3')
-        if self.panel_driver:
-            self.panel_driver.move_panels('dramatic')
-        self.display_logic_text("Darth Vader Approaches")
+    def stop_cinematic(self):
+        """Abort the sequence currently playing."""
+        self.player.stop()
 
-    def _jawa_panic(self):
-        print("[Cinematic] Jawa Panic")
-        if self.sound_driver:
-            self.sound_driver.play_mp3('0003_jawa_panic.mp3')
-        if self.panel_driver:
-            self.panel_driver.move_panels('panic')
-        self.display_logic_text("Jawa! Jawa!")
+    def get_last_drift_report(self):
+        """Cue drift summary of the last playback."""
+        return self.player.get_last_report()
 
-    def _vader_encounter(self):
-        print("[Cinematic] Vader Encounter")
-        if self.sound_driver:
-            self.sound_driver.play_mp3('0004_sad_whistle.mp3')
-        if self.panel_driver:
-            self.panel_driver.move_panels('sad')
-        self.display_logic_text("Bow before Vader...")
+    def _resolve_cue(self, cue):
+        """Map a cue to the driver method that performs it."""
+        if cue.target == 'logic' and cue.action == 'display_text':
+            return self.display_logic_text
+        driver = self.targets.get(cue.target)
+        if driver is None:
+            return None
+        # Don't queue cues onto a serial device that is disconnected or not answering
+        transport = getattr(driver, 'transport', None)
+        if transport is not None and not transport.accepting:
+            print(f"[CinematicManager] '{cue.target}' is {transport.state} → skipping cue")
+            return None
+        return getattr(driver, cue.action, None)
 
     def display_logic_text(self, text: str):
         """
-        Stub: send a string to your logic-light engine
+        Send a string to your logic-light engine (prints if none is attached)
         """
-        print(f"[CinematicManager] Logic display: {text}")
+        if self.logic_driver:
+            self.logic_driver.display_text(text)
+        else:
+            print(f"[CinematicManager] Logic display: {text}")
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+TimelinePlayer:
+  Loads declarative cinematic timelines (JSON) and plays their cues against a
+  monotonic clock on a dedicated thread. Each cue fires early by the measured
+  write latency of its target so the effect lands on its offset, and every
+  playback reports how far cues drifted from schedule.
+"""
+
+import json
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+# at_ms:  offset from the start of the timeline in milliseconds
+# target: logical driver name ('sound', 'panels', 'logic', ...)
+# action: method to call on the target
+# args:   positional arguments for the action
+Cue      = namedtuple('Cue', ['at_ms', 'target', 'action', 'args'])
+Timeline = namedtuple('Timeline', ['name', 'cues'])
+
+
+def load_timeline(path) -> Timeline:
+    """Parse and validate one timeline file; raises ValueError on bad cues."""
+    path = Path(path)
+    raw  = json.loads(path.read_text())
+    name = raw.get('name', path.stem)
+    cues = []
+    for i, c in enumerate(raw.get('cues', [])):
+        try:
+            at_ms = int(c['at_ms'])
+            cue   = Cue(at_ms, str(c['target']), str(c['action']), list(c.get('args', [])))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"{path.name}: cue {i} is invalid ({e})")
+        if at_ms < 0:
+            raise ValueError(f"{path.name}: cue {i} has negative at_ms")
+        cues.append(cue)
+    cues.sort(key=lambda c: c.at_ms)
+    return Timeline(name, cues)
+
+
+def load_timelines(directory) -> dict:
+    """Load every *.json timeline in `directory`, keyed by timeline name."""
+    timelines = {}
+    for path in sorted(Path(directory).glob('*.json')):
+        try:
+            tl = load_timeline(path)
+        except ValueError as e:
+            print(f"[TimelinePlayer] Skipping timeline: {e}")
+            continue
+        timelines[tl.name] = tl
+    return timelines
+
+
+class TimelinePlayer:
+    def __init__(self, resolve, spin_threshold=0.002, latency_alpha=0.2):
+        """
+        :param resolve:        callable(cue) → bound callable to fire, or None to skip
+        :param spin_threshold: Seconds before a deadline to stop sleeping and spin
+        :param latency_alpha:  Smoothing factor for per-target latency estimates
+        """
+        self._resolve        = resolve
+        self._spin_threshold = spin_threshold
+        self._alpha          = latency_alpha
+
+        self._cond       = threading.Condition()
+        self._timeline   = None
+        self._generation = 0
+        self._playing    = False
+        self._latency    = {}   # target → EWMA seconds per call
+        self._report     = None
+
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def play(self, timeline: Timeline):
+        """Start `timeline`, pre-empting whatever is currently playing."""
+        with self._cond:
+            self._generation += 1
+            self._timeline = timeline
+            self._playing  = True
+            self._cond.notify_all()
+
+    def stop(self):
+        """Abort the current playback."""
+        with self._cond:
+            self._generation += 1
+            self._timeline = None
+            self._cond.notify_all()
+
+    def is_playing(self) -> bool:
+        with self._cond:
+            return self._playing
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until playback finishes; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._playing, timeout)
+
+    def get_latency_estimates(self) -> dict:
+        """Current per-target write latency estimates in milliseconds."""
+        with self._cond:
+            return {t: round(s * 1000, 2) for t, s in self._latency.items()}
+
+    def get_last_report(self):
+        """Drift summary of the most recent playback (None before the first)."""
+        with self._cond:
+            return self._report
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._timeline is not None)
+                timeline   = self._timeline
+                generation = self._generation
+                self._timeline = None
+            self._play(timeline, generation)
+
+    def _cancelled(self, generation: int) -> bool:
+        return self._generation != generation
+
+    def _sleep_until(self, deadline: float, generation: int) -> bool:
+        """Sleep until `deadline` (monotonic); False if cancelled meanwhile."""
+        with self._cond:
+            while True:
+                if self._cancelled(generation):
+                    return False
+                remaining = deadline - time.monotonic() - self._spin_threshold
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        # Spin out the last couple of milliseconds for sub-frame precision
+        while time.monotonic() < deadline:
+            pass
+        return True
+
+    def _play(self, timeline: Timeline, generation: int):
+        print(f"[TimelinePlayer] Playing '{timeline.name}' ({len(timeline.cues)} cues)")
+        with self._cond:
+            latency = dict(self._latency)
+        # Fire order accounts for latency compensation
+        schedule = sorted(timeline.cues,
+                          key=lambda c: c.at_ms / 1000.0 - latency.get(c.target, 0.0))
+        # Pre-roll by the slowest target so early-fired cues can still land on time
+        preroll = max((latency.get(c.target, 0.0) for c in timeline.cues), default=0.0)
+        start   = time.monotonic() + preroll
+        drifts  = []
+        for cue in schedule:
+            target_time = start + cue.at_ms / 1000.0
+            fire_at     = target_time - latency.get(cue.target, 0.0)
+            if not self._sleep_until(fire_at, generation):
+                print(f"[TimelinePlayer] '{timeline.name}' pre-empted")
+                break
+
+            fn = self._resolve(cue)
+            if fn is None:
+                print(f"[TimelinePlayer] No driver for '{cue.target}.{cue.action}' → skipping")
+                continue
+            t0 = time.monotonic()
+            try:
+                fn(*cue.args)
+            except Exception as e:
+                print(f"[TimelinePlayer] Cue {cue.target}.{cue.action} failed: {e}")
+            t1 = time.monotonic()
+
+            drifts.append(t1 - target_time)
+            with self._cond:
+                prev = self._latency.get(cue.target)
+                took = t1 - t0
+                self._latency[cue.target] = took if prev is None else \
+                    prev + self._alpha * (took - prev)
+
+        with self._cond:
+            if drifts:
+                abs_ms = [abs(d) * 1000 for d in drifts]
+                self._report = {
+                    'timeline':      timeline.name,
+                    'cues_fired':    len(drifts),
+                    'max_drift_ms':  round(max(abs_ms), 2),
+                    'mean_drift_ms': round(sum(abs_ms) / len(abs_ms), 2)
+                }
+                print(f"[TimelinePlayer] '{timeline.name}' done: "
+                      f"max drift {self._report['max_drift_ms']} ms, "
+                      f"mean {self._report['mean_drift_ms']} ms")
+            # Still "playing" if another timeline was queued while this one ran
+            self._playing = self._timeline is not None
+            self._cond.notify_all()
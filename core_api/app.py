@@ -1,71 +1,185 @@
 #!/usr/bin/env python3
 import os
-import json
 import threading
 import time
-import cv2
 
 from flask import Flask, jsonify, request, send_from_directory
 from flask import Response, stream_with_context
 from flask_cors import CORS
 
+from r2_timer_service        import TimerService
 from r2_profile_manager      import ProfileManager
 from r2_mood_manager         import MoodManager
 from r2_cinematic_manager    import CinematicManager
-from r2_event_stack_manager  import EventStackManager
+from r2_event_stack_manager  import EventStackManager, REJECTED
+from sequence_library        import SequenceLibrary
+from frame_bus               import FrameBus
 from camera_detection_thread import CameraDetectionThread
 from attention_layer         import AttentionLayer
+from mjpeg_broadcaster       import MJPEGBroadcaster
+from status_hub              import StatusHub
+from subsystems              import SubsystemRegistry, SubsystemUnavailable
+from serial_transport        import subscribe_health, transport_stats
 
-# New QA imports
-from r2_qa.qa_module         import QAModule
-from r2_qa.tts_driver        import TTSDriver
+# Detector backend: "ultralytics" (GPU) or "onnx" (CPU, e.g. backup controller / CI)
+DETECTOR_CONFIG = {'backend': os.getenv("R2_DETECTOR_BACKEND", "ultralytics")}
+if DETECTOR_CONFIG['backend'] == 'onnx':
+    DETECTOR_CONFIG.update(
+        model_path = os.getenv("R2_DETECTOR_MODEL", "yolov8n.onnx"),
+        threads    = int(os.getenv("R2_DETECTOR_THREADS", "0")),
+        input_size = int(os.getenv("R2_DETECTOR_INPUT_SIZE", "0")) or None,
+        int8       = os.getenv("R2_DETECTOR_INT8", "0") == "1"
+    )
+# Keep inference off the API process's GIL
+DETECTOR_OUT_OF_PROCESS = os.getenv("R2_DETECTOR_PROCESS", "1") == "1"
 
 app = Flask(__name__, static_folder=None)
 CORS(app)
 
+# Mood light drivers; a missing board or library leaves that output unconnected
+def start_driver(name, factory):
+    try:
+        return factory()
+    except Exception as e:
+        print(f"[R2] {name} not available, its mood output is off: {e}")
+        return None
+
+def make_hp_driver():
+    from filthyhp_driver import FilthyHPDriver
+    return FilthyHPDriver(port=os.getenv("R2_HP_PORT", "/dev/ttyUSB1"))
+
+def make_psi_driver():
+    from psi_driver import PsiDriver
+    return PsiDriver(port=os.getenv("R2_PSI_PORT", "/dev/ttyUSB2"))
+
+def make_logic_driver():
+    from logic_engine_driver import LogicEngineDriver
+    return LogicEngineDriver(os.getenv("R2_LOGIC_CONFIG", "logic_config.json"))
+
+hp_driver    = start_driver('HP LEDs', make_hp_driver)
+psi_driver   = start_driver('PSI', make_psi_driver)
+logic_driver = start_driver('Logic displays', make_logic_driver)
+
 # Initialize core managers
-profile_manager     = ProfileManager()
-mood_manager        = MoodManager()
+timer_service       = TimerService()   # one thread for all auto-reset/revert deadlines
+profile_manager     = ProfileManager(timer_service)
+mood_manager        = MoodManager(timer_service, hp_driver=hp_driver,
+                                  psi_driver=psi_driver, logic_driver=logic_driver)
 cinematic_manager   = CinematicManager(profile_manager)
 event_stack_manager = EventStackManager(profile_manager, mood_manager, cinematic_manager)
-attention_layer     = AttentionLayer(profile_manager, mood_manager)
-camera_thread       = CameraDetectionThread(profile_manager, attention_layer)
+sequence_library    = SequenceLibrary(profile_manager, mood_manager, cinematic_manager)
+sequence_library.compile_all()
+attention_layer     = AttentionLayer(profile_manager, mood_manager, timer_service)
 
-# Initialize QA & TTS
-qa  = QAModule(api_key=os.getenv("OPENAI_API_KEY", None))
-tts = TTSDriver()
-cap = cv2.VideoCapture(0)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 320)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 240)
+# Single camera owner shared by detection and /video_feed
+# (the device is opened by the capture thread, not here)
+frame_bus           = FrameBus(camera_index=0, width=320, height=240)
+video_broadcaster   = MJPEGBroadcaster(frame_bus, fps=5, quality=60)
 
 # Start background threads as daemons
-camera_thread.start()
+frame_bus.start()
+video_broadcaster.start()
 event_stack_manager.start()
 
+# Heavy subsystems come up after the control API: detection in the background,
+# QA and TTS on first /r2/ask. See /r2/health.
+def start_camera_thread():
+    thread = CameraDetectionThread(profile_manager, attention_layer,
+                                   frame_bus=frame_bus,
+                                   detector=DETECTOR_CONFIG,
+                                   out_of_process=DETECTOR_OUT_OF_PROCESS)
+    thread.start()
+    return thread
+
+def start_qa():
+    from r2_qa.qa_module import QAModule
+    # R2_LLM_BACKEND=local: offline stand-in (default when there is no API key)
+    return QAModule(api_key=os.getenv("OPENAI_API_KEY", None),
+                    backend=os.getenv("R2_LLM_BACKEND"),
+                    cache_threshold=float(os.getenv("R2_ANSWER_CACHE_THRESHOLD", "0.9")),
+                    kb_options={'index_type': os.getenv("R2_KB_INDEX", "flat"),
+                                'pq':         int(os.getenv("R2_KB_PQ", "0")),
+                                'nlist':      int(os.getenv("R2_KB_NLIST", "1024"))})
+
+def start_tts():
+    from r2_qa.tts_driver import TTSDriver
+    # Offline by default; R2_TTS_BACKEND=gtts only with a network
+    return TTSDriver(out_dir=os.getenv("R2_TTS_CACHE_DIR", "tts_outputs"),
+                     backend=os.getenv("R2_TTS_BACKEND", "espeak"),
+                     voice=os.getenv("R2_TTS_VOICE"),
+                     max_cache_mb=int(os.getenv("R2_TTS_CACHE_MB", "200")))
+
+subsystems = SubsystemRegistry()
+subsystems.register('camera', start_camera_thread,
+                    on_ready=lambda thread: publish_attention())
+subsystems.register('qa',  start_qa,  lazy=True)
+subsystems.register('tts', start_tts, lazy=True)
+
 recent_actions = []
 
+# Push channel for the dashboard: managers publish changes as they happen
+status_hub = StatusHub()
+
+def status_payload():
+    return {'profile': profile_manager.get_profile(), 'mood': mood_manager.get_mood()}
+
+def attention_enabled() -> bool:
+    """Detection thread's gate, or the profile's until detection is up."""
+    thread = subsystems.peek('camera')
+    if thread is None:
+        return profile_manager.is_attention_enabled()
+    return thread.enabled
+
+def attention_payload():
+    state = attention_layer.get_state()
+    state['attention_enabled'] = attention_enabled()
+    return state
+
+def publish_attention(*_):
+    status_hub.publish('attention', attention_payload())
+
+def on_profile_change(snapshot):
+    status_hub.publish('status', status_payload())
+    publish_attention()
+
+def publish_event_stack(stack):
+    status_hub.publish('event_stack', {'event_stack': stack,
+                                       'stats':       event_stack_manager.get_stats()})
+
+profile_manager.subscribe(on_profile_change)
+mood_manager.subscribe(lambda mood: status_hub.publish('status', status_payload()))
+attention_layer.subscribe(publish_attention)
+event_stack_manager.subscribe(publish_event_stack)
+subscribe_health(lambda transport: status_hub.publish('hardware', transport_stats()))
+
+status_hub.publish('status',      status_payload())
+status_hub.publish('attention',   attention_payload())
+publish_event_stack(event_stack_manager.get_current_stack())
+status_hub.publish('actions',     list(recent_actions))
+status_hub.publish('hardware',    transport_stats())
+
+subsystems.start()
+
 def log_action(msg: str):
     timestamp = time.strftime('%H:%M:%S')
     entry = f"{timestamp} - {msg}"
     recent_actions.insert(0, entry)
     # keep only latest 10
     del recent_actions[10:]
-    
-def mjpeg_generator():
-    """Yield JPEG frames in multipart response."""
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            continue
-        # encode to JPEG
-        ret2, jpeg = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 60])
-        if not ret2:
-            continue
-        # yield frame
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n')
-        time.sleep(1/5)  # 5 fps
+    status_hub.publish('actions', list(recent_actions))
 
+def subsystem_starting_response(name: str):
+    """503 for requests that need a subsystem that isn't up (yet)."""
+    return jsonify({'status': 'error', 'message': f'{name} unavailable',
+                    'health': subsystems.health()['subsystems'][name]}), 503
+
+def queue_full_response():
+    """429 with queue depth when the event stack refuses an event."""
+    stats = event_stack_manager.get_stats()
+    return jsonify({'status': 'error', 'message': 'Event stack full',
+                    'queue_depth': stats['depth'],
+                    'max_depth':   stats['max_depth']}), 429
+    
 @app.route('/')
 def dashboard():
     return send_from_directory('..', 'dashboard/r2_operator_dashboard.html')
@@ -98,22 +212,29 @@ def trigger_cinematic(cinematic_name):
 
 @app.route('/r2/trigger_quick_mood/<mood_name>', methods=['POST'])
 def trigger_quick_mood(mood_name):
-    event_stack_manager.add_event('quick_mood', mood_name)
+    result = event_stack_manager.add_event('quick_mood', mood_name)
+    if result == REJECTED:
+        return queue_full_response()
     log_action(f"Triggered Quick Mood: {mood_name}")
-    return jsonify({'status': 'ok'})
+    return jsonify({'status': 'ok', 'result': result,
+                    'queue_depth': event_stack_manager.get_queue_depth()})
 
 @app.route('/r2/add_event', methods=['POST'])
 def add_event():
     data = request.get_json() or {}
     if 'event_type' not in data or 'event_data' not in data:
         return jsonify({'status':'error','message':'Missing fields'}), 400
-    event_stack_manager.add_event(data['event_type'], data['event_data'])
+    result = event_stack_manager.add_event(data['event_type'], data['event_data'])
+    if result == REJECTED:
+        return queue_full_response()
     log_action(f"Added Event: {data['event_type']}/{data['event_data']}")
-    return jsonify({'status': 'ok'})
+    return jsonify({'status': 'ok', 'result': result,
+                    'queue_depth': event_stack_manager.get_queue_depth()})
 
 @app.route('/r2/event_stack', methods=['GET'])
 def get_event_stack():
-    return jsonify({'event_stack': event_stack_manager.get_current_stack()})
+    return jsonify({'event_stack': event_stack_manager.get_current_stack(),
+                    'stats':       event_stack_manager.get_stats()})
 
 @app.route('/r2/clear_event_stack', methods=['POST'])
 def clear_event_stack():
@@ -136,42 +257,102 @@ def stop_all():
 
 @app.route('/r2/attention_state', methods=['GET'])
 def attention_state():
+    camera_thread = subsystems.peek('camera')
     return jsonify({
-        'attention_enabled': camera_thread.enabled,
+        'attention_enabled': attention_enabled(),
         'attention_active':  attention_layer.attention_active,
-        'attention_target':  attention_layer.attention_target
+        'attention_target':  attention_layer.attention_target,
+        'attention_bbox':    attention_layer.attention_bbox,
+        'attention_confidence': attention_layer.attention_confidence,
+        'pipeline':          camera_thread.get_pipeline_stats() if camera_thread else None
     })
 
 @app.route('/r2/load_event_stack/<sequence_name>', methods=['POST'])
 def load_event_stack(sequence_name):
     try:
-        seq_path = os.path.join('..', 'sequences', f"{sequence_name}.json")
-        with open(seq_path, 'r') as f:
-            seq = json.load(f)
-        for e in seq:
-            event_stack_manager.add_event(e['event_type'], e['event_data'])
-        log_action(f"Loaded Sequence: {sequence_name}")
-        return jsonify({'status': 'ok'})
-    except FileNotFoundError:
+        steps = sequence_library.get(sequence_name)
+    except KeyError:
         return jsonify({'status':'error','message':'Sequence not found'}), 404
-    except Exception as e:
-        return jsonify({'status':'error','message':str(e)}), 500
+    except ValueError as e:
+        return jsonify({'status':'error','message':f'Invalid sequence: {e}'}), 400
+    if event_stack_manager.add_events(steps) == REJECTED:
+        return queue_full_response()
+    log_action(f"Loaded Sequence: {sequence_name}")
+    return jsonify({'status': 'ok', 'steps': len(steps),
+                    'queue_depth': event_stack_manager.get_queue_depth()})
+
+@app.route('/r2/sequences', methods=['GET'])
+def list_sequences():
+    return jsonify({'sequences': sequence_library.names(),
+                    'errors':    sequence_library.errors})
 
 @app.route('/r2/attention_enable', methods=['POST'])
 def attention_enable():
+    camera_thread = subsystems.peek('camera')
+    if camera_thread is None:
+        return subsystem_starting_response('camera')
     camera_thread.enable()
+    publish_attention()
     return jsonify({'status':'ok','enabled':True})
 
 @app.route('/r2/attention_disable', methods=['POST'])
 def attention_disable():
+    camera_thread = subsystems.peek('camera')
+    if camera_thread is None:
+        return subsystem_starting_response('camera')
     camera_thread.disable()
+    publish_attention()
     return jsonify({'status':'ok','enabled':False})
     
 @app.route('/video_feed')
 def video_feed():
-    return Response(stream_with_context(mjpeg_generator()),
+    return Response(stream_with_context(video_broadcaster.stream()),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
     
+@app.route('/r2/health', methods=['GET'])
+def health():
+    """Readiness of the control API and each background subsystem."""
+    return jsonify(subsystems.health())
+
+@app.route('/r2/hardware', methods=['GET'])
+def hardware():
+    """Per-port serial health, plus per-device mood output latency."""
+    return jsonify({'transports': transport_stats(),
+                    'mood_outputs': mood_manager.get_output_stats()})
+
+@app.route('/r2/events')
+def events():
+    """Server-sent events: status, attention, event_stack, actions, hardware, heartbeat."""
+    return Response(stream_with_context(status_hub.stream()),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 # NEW: Ask R2 endpoint
 @app.route('/r2/ask', methods=['POST'])
 def ask_r2():
+    data = request.get_json(silent=True) or {}
+    question = (data.get('question') or '').strip()
+    if not question:
+        return jsonify({'status':'error','message':'No question provided'}), 400
+    try:
+        # First call loads the retrieval model / opens the audio driver
+        qa  = subsystems.get('qa')
+        tts = subsystems.get('tts')
+    except SubsystemUnavailable as e:
+        return jsonify({'status':'error','message':str(e)}), 503
+    from r2_qa.ask_pipeline import ask_and_speak
+    # Speech starts with the first generated sentence, not the whole answer
+    result = ask_and_speak(qa, tts, question)
+    log_action(f"Asked R2: {question}")
+    return jsonify({'status':'ok', **result})
+
+@app.route('/r2/ask/stats', methods=['GET'])
+def ask_stats():
+    """Answer cache and TTS cache hit rates (empty until /r2/ask was used)."""
+    qa, tts = subsystems.peek('qa'), subsystems.peek('tts')
+    return jsonify({'qa':  qa.get_stats() if qa else None,
+                    'tts': tts.get_stats() if tts else None})
+
+if __name__ == '__main__':
+    # Development server; production runs server.py
+    app.run(host='0.0.0.0', port=5000, threaded=True)
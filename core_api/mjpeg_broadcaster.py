@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+MJPEGBroadcaster:
+  Encodes frames from the shared FrameBus to JPEG exactly once and fans the
+  bytes out to every /video_feed client. Each client only ever sees the most
+  recent chunk, so a slow client drops frames instead of building a queue.
+  astream() serves the same chunks to asyncio servers without a thread per
+  client.
+"""
+
+import asyncio
+import threading
+import time
+
+import cv2
+
+class MJPEGBroadcaster:
+    def __init__(self, frame_bus, fps=5, quality=60, max_backoff=2.0):
+        """
+        :param frame_bus:   FrameBus to read frames from
+        :param fps:         Maximum encode/broadcast rate
+        :param quality:     JPEG quality (0–100)
+        :param max_backoff: Longest wait between retries while the camera is gone
+        """
+        self.frame_bus = frame_bus
+        self.running   = False
+
+        self._frame_delay = 1.0 / fps
+        self._params      = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+        self._max_backoff = max_backoff
+
+        self._cond    = threading.Condition()
+        self._chunk   = None
+        self._seq     = 0
+        self._clients = 0
+        self._wakers  = []   # async clients: callables that wake their loop
+
+    def start(self):
+        """Start the encoder loop in a daemon thread."""
+        if not self.running:
+            print("[MJPEGBroadcaster] Starting encoder thread...")
+            self.running = True
+            threading.Thread(target=self._loop, daemon=True).start()
+
+    def stop(self):
+        """Stop encoding and release any waiting clients."""
+        print("[MJPEGBroadcaster] Stopping encoder thread...")
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+            for wake in self._wakers:
+                wake()
+
+    def client_count(self) -> int:
+        """Number of currently connected stream clients."""
+        with self._cond:
+            return self._clients
+
+    def _loop(self):
+        last_seq = 0
+        backoff  = self._frame_delay
+        while self.running:
+            # Nothing to do until someone is watching
+            with self._cond:
+                self._cond.wait_for(lambda: self._clients > 0 or not self.running)
+            if not self.running:
+                break
+
+            started = time.monotonic()
+            latest = self.frame_bus.wait_for_frame(last_seq, timeout=1.0)
+            if latest is None:
+                # Camera is gone or stalled → back off instead of spinning
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self._max_backoff)
+                continue
+            backoff  = self._frame_delay
+            last_seq = latest.seq
+
+            ret, jpeg = cv2.imencode('.jpg', latest.image, self._params)
+            if ret:
+                chunk = (b'--frame\r\n'
+                         b'Content-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n')
+                with self._cond:
+                    self._chunk = chunk
+                    self._seq  += 1
+                    self._cond.notify_all()
+                    for wake in self._wakers:
+                        wake()
+
+            elapsed = time.monotonic() - started
+            if elapsed < self._frame_delay:
+                time.sleep(self._frame_delay - elapsed)
+
+    def stream(self):
+        """Generator yielding multipart JPEG chunks for one client."""
+        with self._cond:
+            self._clients += 1
+            self._cond.notify_all()
+        last_seq = 0
+        try:
+            while self.running:
+                with self._cond:
+                    self._cond.wait_for(
+                        lambda: self._seq > last_seq or not self.running, 1.0)
+                    if self._seq <= last_seq:
+                        continue
+                    # Skip straight to the newest chunk; older ones are dropped
+                    last_seq = self._seq
+                    chunk    = self._chunk
+                yield chunk
+        finally:
+            with self._cond:
+                self._clients -= 1
+
+    async def astream(self):
+        """Async generator yielding multipart JPEG chunks for one client."""
+        loop  = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                pass   # loop already closed during shutdown
+
+        with self._cond:
+            self._clients += 1
+            self._wakers.append(wake)
+            self._cond.notify_all()
+        last_seq = 0
+        try:
+            while self.running:
+                try:
+                    await asyncio.wait_for(ready.wait(), 1.0)
+                except asyncio.TimeoutError:
+                    continue
+                ready.clear()
+                with self._cond:
+                    if self._seq <= last_seq:
+                        continue
+                    last_seq = self._seq
+                    chunk    = self._chunk
+                yield chunk
+        finally:
+            with self._cond:
+                self._clients -= 1
+                self._wakers = [w for w in self._wakers if w is not wake]
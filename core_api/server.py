@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+server.py — production entry point for the core API.
+
+Runs one uvicorn worker (one process, so the serial ports, camera and
+managers keep a single owner) with:
+  • /video_feed and /r2/events served natively on the asyncio loop — an
+    open stream costs a few KB of memory, not a request thread
+  • every other route handed to the Flask app on a fixed thread pool that
+    streams can never occupy, so viewers can't starve the control endpoints
+
+    python3 core_api/server.py        # R2_HOST, R2_PORT, R2_API_THREADS
+
+`python3 core_api/app.py` remains the Flask development server.
+"""
+
+import asyncio
+import os
+
+import uvicorn
+from a2wsgi import WSGIMiddleware
+
+import app as core
+
+HOST        = os.getenv("R2_HOST", "0.0.0.0")
+PORT        = int(os.getenv("R2_PORT", "5000"))
+API_THREADS = int(os.getenv("R2_API_THREADS", "8"))
+
+# path → (async generator factory, content type, extra headers)
+STREAMS = {
+    '/video_feed': (core.video_broadcaster.astream,
+                    'multipart/x-mixed-replace; boundary=frame', []),
+    '/r2/events':  (core.status_hub.astream,
+                    'text/event-stream',
+                    [(b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]),
+}
+
+flask_app = WSGIMiddleware(core.app, workers=API_THREADS)
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _stream(factory, content_type, headers, receive, send):
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', content_type.encode())] + headers})
+
+    async def pump():
+        async for chunk in factory():
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+    # Streams never end on their own; stop when the client goes away
+    pumping      = asyncio.ensure_future(pump())
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    await asyncio.wait({pumping, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+    client_gone = disconnected.done()
+    for task in (pumping, disconnected):
+        task.cancel()
+    if not client_gone:
+        # Producer stopped (shutdown): end the response cleanly
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            core.video_broadcaster.stop()
+            camera_thread = core.subsystems.peek('camera')
+            if camera_thread is not None:
+                camera_thread.stop()
+            core.frame_bus.stop()
+            core.event_stack_manager.shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI entry point."""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+    elif scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'] in STREAMS:
+        await _stream(*STREAMS[scope['path']], receive, send)
+    else:
+        await flask_app(scope, receive, send)
+
+
+if __name__ == '__main__':
+    # workers=1 is deliberate: a second process would fight over the hardware
+    uvicorn.run(application, host=HOST, port=PORT, workers=1,
+                timeout_graceful_shutdown=3)
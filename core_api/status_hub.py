@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+StatusHub:
+  Server-sent events fan-out for the operator dashboard. Managers publish
+  state changes by topic; each connected client gets the full state on
+  connect and afterwards only the topics that changed. Rapid changes to the
+  same topic collapse to the latest value, so a slow client never builds up
+  a backlog.
+
+  stream() is a blocking generator for threaded WSGI servers; astream() is
+  the asyncio equivalent used by server.py, where an idle client costs no
+  thread at all.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+class StatusHub:
+    def __init__(self, heartbeat=5.0):
+        """
+        :param heartbeat: Seconds between heartbeat events on an idle stream
+        """
+        self._heartbeat = heartbeat
+        self._cond    = threading.Condition()
+        self._state   = {}   # topic → latest payload
+        self._clients = []   # one set of dirty topics per client
+        self._wakers  = []   # async clients: callables that wake their loop
+
+    def publish(self, topic: str, payload):
+        """Record the latest payload for `topic` and wake all clients."""
+        with self._cond:
+            self._state[topic] = payload
+            for dirty in self._clients:
+                dirty.add(topic)
+            self._cond.notify_all()
+            for wake in self._wakers:
+                wake()
+
+    def client_count(self) -> int:
+        with self._cond:
+            return len(self._clients)
+
+    @staticmethod
+    def _format(topic: str, payload) -> str:
+        return f"event: {topic}\ndata: {json.dumps(payload)}\n\n"
+
+    def _register(self, dirty, wake=None):
+        """Add a client; returns the messages that bring it up to date."""
+        with self._cond:
+            self._clients.append(dirty)
+            if wake is not None:
+                self._wakers.append(wake)
+            initial = dict(self._state)
+        # Full state first so the page renders without extra requests
+        messages = ["retry: 2000\n\n"]
+        messages += [self._format(t, p) for t, p in initial.items()]
+        messages.append(self._format('heartbeat', int(time.time())))
+        return messages
+
+    def _unregister(self, dirty, wake=None):
+        with self._cond:
+            # Identity, not equality: empty sets compare equal
+            self._clients = [c for c in self._clients if c is not dirty]
+            self._wakers  = [w for w in self._wakers if w is not wake]
+
+    def _take(self, dirty, next_beat):
+        """
+        Messages for the topics that changed since the last call, plus a
+        heartbeat once `next_beat` has passed (lock held). Returns
+        (messages, next_beat).
+        """
+        messages = [self._format(t, self._state[t]) for t in dirty]
+        dirty.clear()
+        # Own interval: a client behind a proxy must see heartbeats even
+        # while some topic changes constantly
+        now = time.monotonic()
+        if now >= next_beat:
+            messages.append(self._format('heartbeat', int(time.time())))
+            next_beat = now + self._heartbeat
+        return messages, next_beat
+
+    def stream(self):
+        """Generator of SSE messages for one client."""
+        dirty = set()
+        try:
+            yield from self._register(dirty)
+            next_beat = time.monotonic() + self._heartbeat
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: dirty, max(0.0, next_beat - time.monotonic()))
+                    messages, next_beat = self._take(dirty, next_beat)
+                yield from messages
+        finally:
+            self._unregister(dirty)
+
+    async def astream(self):
+        """Async generator of SSE messages for one client."""
+        loop  = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        dirty = set()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                pass   # loop already closed during shutdown
+
+        try:
+            for message in self._register(dirty, wake):
+                yield message
+            next_beat = time.monotonic() + self._heartbeat
+            while True:
+                try:
+                    await asyncio.wait_for(ready.wait(), max(0.0, next_beat - time.monotonic()))
+                except asyncio.TimeoutError:
+                    pass
+                # Clear before reading: a publish in between re-arms the event
+                ready.clear()
+                with self._cond:
+                    messages, next_beat = self._take(dirty, next_beat)
+                for message in messages:
+                    yield message
+        finally:
+            self._unregister(dirty, wake)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+SubsystemRegistry:
+  Brings heavy subsystems (detector model, camera, QA retrieval, TTS) up
+  without holding up the control API. Eager subsystems are constructed
+  concurrently on a small thread pool as soon as start() is called; lazy
+  ones are constructed on first use. health() reports where each one is.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Subsystem states
+DEFERRED = 'deferred'   # lazy, not requested yet
+PENDING  = 'pending'    # eager, waiting for a pool thread
+STARTING = 'starting'
+READY    = 'ready'
+FAILED   = 'failed'
+
+
+class SubsystemUnavailable(RuntimeError):
+    """Raised by get() when a subsystem failed or isn't ready in time."""
+
+
+class _Subsystem:
+    def __init__(self, name, factory, lazy, on_ready):
+        self.name     = name
+        self.factory  = factory
+        self.lazy     = lazy
+        self.on_ready = on_ready
+        self.state    = DEFERRED if lazy else PENDING
+        self.instance = None
+        self.error    = None
+        self.started  = None
+        self.elapsed  = None
+        self.done     = threading.Event()
+
+
+class SubsystemRegistry:
+    def __init__(self, max_workers=4):
+        """
+        :param max_workers: Eager subsystems constructed in parallel
+        """
+        self._subsystems = {}
+        self._lock       = threading.Lock()
+        self._pool       = ThreadPoolExecutor(max_workers=max_workers,
+                                              thread_name_prefix='r2-startup')
+        self._created    = time.monotonic()
+
+    def register(self, name: str, factory, lazy: bool = False, on_ready=None):
+        """
+        :param factory:  Zero-argument callable returning the subsystem instance
+        :param lazy:     Construct on first get() instead of at start()
+        :param on_ready: Optional callback(instance) run once construction succeeds
+        """
+        self._subsystems[name] = _Subsystem(name, factory, lazy, on_ready)
+
+    def start(self):
+        """Begin constructing every eager subsystem in the background."""
+        for sub in self._subsystems.values():
+            if not sub.lazy:
+                self._pool.submit(self._build, sub)
+
+    def _build(self, sub):
+        with self._lock:
+            if sub.state not in (DEFERRED, PENDING):
+                return
+            sub.state   = STARTING
+            sub.started = time.monotonic()
+        print(f"[Subsystems] Starting {sub.name}...")
+        try:
+            instance = sub.factory()
+        except Exception as e:
+            with self._lock:
+                sub.state, sub.error = FAILED, f"{type(e).__name__}: {e}"
+                sub.elapsed = time.monotonic() - sub.started
+            print(f"[Subsystems] {sub.name} failed: {sub.error}")
+        else:
+            with self._lock:
+                sub.state, sub.instance = READY, instance
+                sub.elapsed = time.monotonic() - sub.started
+            print(f"[Subsystems] {sub.name} ready in {sub.elapsed:.1f}s")
+            if sub.on_ready:
+                sub.on_ready(instance)
+        finally:
+            sub.done.set()
+
+    def get(self, name: str, timeout: float = None):
+        """
+        Return the subsystem instance, constructing a lazy one in the calling
+        thread if nobody has yet. Raises SubsystemUnavailable if it failed or
+        isn't ready within `timeout` seconds (None = wait indefinitely).
+        """
+        sub = self._subsystems[name]
+        if sub.state == DEFERRED:
+            self._build(sub)   # no-op if another thread got there first
+        if not sub.done.wait(timeout):
+            raise SubsystemUnavailable(f"{name} is still {sub.state}")
+        if sub.state == FAILED:
+            raise SubsystemUnavailable(f"{name} failed: {sub.error}")
+        return sub.instance
+
+    def peek(self, name: str):
+        """Return the instance if it is ready, else None; never blocks."""
+        sub = self._subsystems[name]
+        return sub.instance if sub.state == READY else None
+
+    def health(self) -> dict:
+        """Overall status plus per-subsystem state and startup time."""
+        with self._lock:
+            subs = {
+                s.name: {
+                    'state':   s.state,
+                    'lazy':    s.lazy,
+                    'seconds': round(s.elapsed, 2) if s.elapsed is not None else None,
+                    'error':   s.error
+                } for s in self._subsystems.values()
+            }
+        states = [s['state'] for s in subs.values()]
+        if FAILED in states:
+            status = 'degraded'
+        elif PENDING in states or STARTING in states:
+            status = 'starting'
+        else:
+            status = 'ok'
+        return {'status': status,
+                'uptime': round(time.monotonic() - self._created, 1),
+                'subsystems': subs}
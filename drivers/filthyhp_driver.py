@@ -1,17 +1,34 @@
 #!/usr/bin/env python3
-import serial, time
+from serial_protocols import LineProtocol
+from serial_transport import get_transport
 
 class FilthyHPDriver:
     """
     Serial driver for FLthyHP-based boards (periscope lifter, spinner, holo lights).
     """
-    def __init__(self, port='/dev/ttyUSB1', baudrate=115200, timeout=0.1):
-        self.ser = serial.Serial(port, baudrate, timeout=timeout)
-        time.sleep(1)
+    def __init__(self, port='/dev/ttyUSB1', baudrate=115200, timeout=0.1,
+                 ack=False, usb_serial=None):
+        """
+        :param ack:        Expect the sketch's "Received Command" echo for every
+                           packet (enable only if your sketch prints it)
+        :param usb_serial: USB serial number, to find the board after re-enumeration
+        """
+        # Shared with any other driver on the same port (holo + periscope)
+        self.transport = get_transport(port, baudrate=baudrate, timeout=timeout, settle=1,
+                                       protocol=LineProtocol(ack_prefix="Received Command"),
+                                       usb_serial=usb_serial)
+        self.ack = ack
+
+    def send_command(self, cmd: bytes, key=None) -> bool:
+        """Low‐level write; queued packets with the same key collapse to the latest."""
+        return self.transport.write(cmd, key, ack=self.ack)
 
-    def send_command(self, cmd: bytes):
-        """Low‐level write."""
-        self.ser.write(cmd)
+    def send_hp_command(self, cmd: str) -> bool:
+        """
+        FlthyHP text command for the HP LEDs, e.g. 'A0071' (short circuit, red)
+        or 'S5' (auto mode); see Manuals/FlthyHPs_v1.8.ino. Only the latest is kept.
+        """
+        return self.send_command((cmd + '\r').encode('ascii'), key='hp')
 
     def set_periscope_height(self, mm: int):
         """
@@ -21,15 +38,15 @@ class FilthyHPDriver:
         hi = (mm >> 8) & 0xFF
         lo = mm & 0xFF
         packet = bytes([0xAA,0x01,hi,lo,0x55])
-        self.send_command(packet)
+        self.send_command(packet, key='height')
 
     def spin_periscope(self, rpm: int):
         hi = (rpm >> 8) & 0xFF
         lo = rpm & 0xFF
         packet = bytes([0xAA,0x02,hi,lo,0x55])
-        self.send_command(packet)
+        self.send_command(packet, key='spin')
 
     def set_holo_brightness(self, level: int):
         """0–255 brightness."""
         packet = bytes([0xAA,0x03,level & 0xFF,0x00,0x55])
-        self.send_command(packet)
+        self.send_command(packet, key='holo')
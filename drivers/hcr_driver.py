@@ -1,17 +1,17 @@
 #!/usr/bin/env python3
-import serial, time
+from serial_transport import get_transport
 
 class HcrDriver:
     """
     Serial interface to the HumanCyborgRelations vocalizer.
     """
-    def __init__(self, port='/dev/ttyUSB3', baudrate=115200, timeout=0.1):
-        self.ser = serial.Serial(port, baudrate, timeout=timeout)
-        time.sleep(1)
+    def __init__(self, port='/dev/ttyUSB3', baudrate=115200, timeout=0.1, usb_serial=None):
+        self.transport = get_transport(port, baudrate=baudrate, timeout=timeout, settle=1,
+                                       usb_serial=usb_serial)
 
     def send_text(self, text: str):
         """
         Send a text packet—your sketch decides how to parse and speak.
         """
         data = text.encode('utf-8') + b'\n'
-        self.ser.write(data)
+        self.transport.write(data)
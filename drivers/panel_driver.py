@@ -1,31 +1,198 @@
 #!/usr/bin/env python3
-from pololu_maestro import Maestro
+import json
+import math
+import threading
+import time
+from pathlib import Path
+
+from serial_transport import get_transport
+
+POSES_PATH = Path(__file__).resolve().parent.parent / "panels" / "poses.json"
 
 class PanelDriver:
     """
     Driver for Pololu Maestro servo controllers (dome panels).
+    Poses and trajectories come from panels/poses.json. A pose is one
+    "Set Multiple Targets" command for all channels; a trajectory streams
+    interpolated, speed/acceleration-limited targets at a fixed control rate.
+    Targets are in Maestro units (quarter-microseconds; 6000 = 1500 µs).
     """
-    def __init__(self, port='/dev/ttyACM0', device_number=1):
+    def __init__(self, port='/dev/ttyACM0', device_number=1, poses_path=POSES_PATH,
+                 rate_hz=50):
         # adjust port and device_number to your setup
-        self.maestro = Maestro(port=port, device_number=device_number, baud=57600)
-    
-    def move_panels(self, mode: str):
+        self.transport     = get_transport(port, baudrate=57600)
+        self.device_number = device_number
+        self.poses_path    = Path(poses_path)
+        self._dt           = 1.0 / rate_hz
+
+        # Only the control thread writes targets and _position/_velocity;
+        # API calls post work to it
+        self._cond       = threading.Condition()
+        self._pending    = None   # (keyframes [(t_s, targets), ...], snap packet or None)
+        self._generation = 0
+        self._position   = None   # last targets sent, per channel
+        self._velocity   = None
+
+        self.reload_poses()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def reload_poses(self):
+        """(Re)load poses and trajectories and rebuild the pose packets."""
+        config = json.loads(self.poses_path.read_text())
+        self.first_channel = config.get('first_channel', 0)
+        self.channels      = config.get('channels', 7)
+        self.max_speed     = config.get('max_speed')   # units/s, None = unlimited
+        self.max_accel     = config.get('max_accel')   # units/s², None = unlimited
+        self.poses = {name: list(targets) for name, targets in config.get('poses', {}).items()}
+        for name, targets in self.poses.items():
+            if len(targets) != self.channels:
+                raise ValueError(f"Pose '{name}' has {len(targets)} targets, expected {self.channels}")
+        self.trajectories = {name: [(int(t), pose) for t, pose in frames]
+                             for name, frames in config.get('trajectories', {}).items()}
+        self._pose_packets = {name: self._set_targets_packet(t) for name, t in self.poses.items()}
+        print(f"[PanelDriver] Loaded {len(self.poses)} poses, "
+              f"{len(self.trajectories)} trajectories from {self.poses_path}")
+
+    def _set_targets_packet(self, targets) -> bytes:
+        """Pololu protocol "Set Multiple Targets": one command for every channel."""
+        pkt = bytearray([0xAA, self.device_number, 0x1F, len(targets), self.first_channel])
+        for t in targets:
+            t = int(t)
+            pkt += bytes([t & 0x7F, (t >> 7) & 0x7F])
+        return bytes(pkt)
+
+    def _send_targets(self, targets, packet=None):
+        # Control thread only, with _cond held and the generation checked.
+        # Keyed: if the writer falls behind, only the newest targets are sent
+        self.transport.write(packet or self._set_targets_packet(targets), key='targets')
+        self._position = list(targets)
+
+    def move_panels(self, mode: str, duration_ms: int = 0):
         """
-        Move your 4 dome + 3 side panels into a preset pose.
-        Mode examples: 'neutral','sad','dramatic','panic'
+        Move your 4 dome + 3 side panels into a preset pose, or run a named
+        trajectory. With duration_ms > 0 a pose is approached smoothly.
+        Mode examples: 'neutral','sad','dramatic','panic','scroll'
         """
-        if mode == 'neutral':
-            # channels 0–6 to “home” positions
-            for ch, pos in enumerate([6000,6000,6000,6000,6000,6000,6000]):
-                self.maestro.set_target(ch, pos)
-        elif mode == 'sad':
-            for ch, pos in enumerate([5500,5500,5500,5500,5500,5500,5500]):
-                self.maestro.set_target(ch, pos)
-        elif mode == 'dramatic':
-            for ch, pos in enumerate([6500,6500,6500,6500,6500,6500,6500]):
-                self.maestro.set_target(ch, pos)
-        elif mode == 'panic':
-            for ch, pos in enumerate([7000,5000,7000,5000,7000,5000,7000]):
-                self.maestro.set_target(ch, pos)
-        else:
+        with self._cond:
+            position = self._position
+        if mode in self.trajectories:
+            self.run_trajectory(mode)
+        elif mode not in self.poses:
             print(f"[PanelDriver] Unknown mode '{mode}'")
+        elif duration_ms > 0 and position is not None:
+            self.play_keyframes([(0, position), (duration_ms, mode)])
+        else:
+            # Snap as a one-frame job, so a tick already in flight can't overwrite it
+            self._post([(0.0, self.poses[mode])], self._pose_packets[mode])
+
+    def run_trajectory(self, name: str):
+        """Play a trajectory from poses.json."""
+        frames = self.trajectories.get(name)
+        if frames is None:
+            print(f"[PanelDriver] Unknown trajectory '{name}'")
+            return
+        self.play_keyframes(frames)
+
+    def play_keyframes(self, keyframes):
+        """
+        Stream a trajectory: keyframes are (at_ms, pose name or target list),
+        interpolated at the control rate. Pre-empts any running trajectory.
+        """
+        frames = []
+        for at_ms, pose in sorted(keyframes, key=lambda k: k[0]):
+            targets = self.poses[pose] if isinstance(pose, str) else list(pose)
+            frames.append((at_ms / 1000.0, targets))
+        self._post(frames)
+
+    def _post(self, frames, snap_packet=None):
+        """Hand a job to the control thread, pre-empting the current one."""
+        with self._cond:
+            self._generation += 1
+            self._pending = (frames, snap_packet)
+            self._cond.notify_all()
+
+    def stop(self):
+        """Abort a running trajectory, holding the current position."""
+        self._cancel()
+
+    def _cancel(self):
+        with self._cond:
+            self._generation += 1
+            self._pending = None
+            self._cond.notify_all()
+
+    @staticmethod
+    def _interpolate(frames, t):
+        """Targets at time t (seconds), smoothstep-eased between keyframes."""
+        if t <= frames[0][0]:
+            return frames[0][1]
+        for (t0, a), (t1, b) in zip(frames, frames[1:]):
+            if t <= t1:
+                u = (t - t0) / (t1 - t0) if t1 > t0 else 1.0
+                u = u * u * (3 - 2 * u)
+                return [pa + (pb - pa) * u for pa, pb in zip(a, b)]
+        return frames[-1][1]
+
+    def _limit(self, targets):
+        """Clamp the step towards `targets` to the speed and acceleration limits."""
+        dt  = self._dt
+        pos = self._position or targets
+        vel = self._velocity or [0.0] * len(targets)
+        out, new_vel = [], []
+        for p, v, goal in zip(pos, vel, targets):
+            want = (goal - p) / dt
+            if self.max_speed:
+                want = max(-self.max_speed, min(self.max_speed, want))
+            if self.max_accel:
+                # Never faster than we can still brake from before the goal
+                brake = math.sqrt(2 * self.max_accel * abs(goal - p))
+                want  = max(-brake, min(brake, want))
+                dv    = self.max_accel * dt
+                want  = max(v - dv, min(v + dv, want))
+            new_vel.append(want)
+            out.append(p + want * dt)
+        self._velocity = new_vel
+        return out
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None)
+                (frames, snap_packet), generation = self._pending, self._generation
+                self._pending = None
+                if snap_packet is not None:
+                    self._send_targets(frames[0][1], snap_packet)
+                    self._velocity = None
+                    continue
+            self._play(frames, generation)
+
+    def _send_current(self, targets, generation) -> bool:
+        """Send unless a newer job has been posted; False if pre-empted."""
+        with self._cond:
+            if self._generation != generation:
+                return False
+            self._send_targets(targets)
+            return True
+
+    def _play(self, frames, generation):
+        start   = time.monotonic()
+        end     = frames[-1][0]
+        final   = [int(round(t)) for t in frames[-1][1]]
+        tick    = 0
+        while True:
+            t = tick * self._dt
+            targets = [int(round(p)) for p in self._limit(self._interpolate(frames, t))]
+            if not self._send_current(targets, generation):
+                return
+            if t >= end and targets == final:
+                break
+            if t >= end + 2.0:
+                self._send_current(final, generation)   # limits too tight to settle: snap
+                break
+            tick += 1
+            # Fixed control rate against the start time, so jitter doesn't accumulate
+            with self._cond:
+                if self._cond.wait_for(lambda: self._generation != generation,
+                                       max(0.0, start + tick * self._dt - time.monotonic())):
+                    return
+        self._velocity = None
@@ -1,13 +1,14 @@
 #!/usr/bin/env python3
-import serial, time
+from serial_transport import get_transport
 
 class PsiDriver:
     """
     PSIPro v1.7 lights driver via serial.
     """
-    def __init__(self, port='/dev/ttyUSB2', baudrate=115200, timeout=0.1):
-        self.ser = serial.Serial(port, baudrate, timeout=timeout)
-        time.sleep(0.5)
+    def __init__(self, port='/dev/ttyUSB2', baudrate=115200, timeout=0.1, usb_serial=None):
+        # Replies are PSIPro's debug lines: liveness only, no per-command ACK
+        self.transport = get_transport(port, baudrate=baudrate, timeout=timeout, settle=0.5,
+                                       usb_serial=usb_serial)
 
     def set_psi_state(self, index: int, state: bool):
         """
@@ -17,4 +18,13 @@ class PsiDriver:
         cmd = bytearray([0xA5, index, 1 if state else 0])
         chk = (sum(cmd) & 0xFF) ^ 0xFF
         cmd.append(chk)
-        self.ser.write(cmd)
+        # Only the latest state per PSI matters
+        self.transport.write(cmd, key=('psi', index))
+
+    def trigger_mode(self, mode: int, address: int = 0, seconds: int = None):
+        """
+        JawaLite "T" command: 0T5 = scream, 0T1 = default swipe, 0T0 = off
+        (address 0 = all PSIs). With `seconds` the mode reverts afterwards.
+        """
+        cmd = f"{address}T{mode}" + (f"|{seconds}" if seconds else "") + "\r"
+        self.transport.write(cmd.encode('ascii'), key=('psi_mode', address))
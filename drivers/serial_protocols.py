@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Reply parsers for SerialTransport's reader thread. A protocol turns raw
+bytes from the port into Reply records and says which replies acknowledge
+(or reject) the oldest command still awaiting an answer.
+"""
+
+from collections import namedtuple
+
+# kind:  protocol-specific reply type (DFPlayer command byte, 'line', …)
+# value: decoded payload (DFPlayer 16-bit parameter, text line)
+# raw:   the reply bytes as received
+Reply = namedtuple('Reply', ['kind', 'value', 'raw'])
+
+
+class LineProtocol:
+    """
+    Newline-terminated text replies, e.g. FlthyHP's "Received Command: …"
+    echo or PSIPro's debug output.
+    """
+
+    def __init__(self, ack_prefix=None, max_line=256):
+        """
+        :param ack_prefix: A line starting with this acknowledges a command;
+                           None = any line does
+        :param max_line:   Bytes kept for an unterminated line
+        """
+        self.ack_prefix = ack_prefix
+        self._max_line  = max_line
+        self._buf = b''
+
+    def feed(self, data: bytes):
+        self._buf += data
+        *lines, self._buf = self._buf.split(b'\n')
+        self._buf = self._buf[-self._max_line:]
+        replies = []
+        for raw in lines:
+            text = raw.decode('utf-8', 'replace').strip()
+            if text:
+                replies.append(Reply('line', text, raw))
+        return replies
+
+    def is_ack(self, reply) -> bool:
+        return self.ack_prefix is None or reply.value.startswith(self.ack_prefix)
+
+    def is_error(self, reply) -> bool:
+        return False
+
+
+class DFPlayerProtocol:
+    """
+    DFPlayer Mini 10-byte frames: 7E FF 06 <cmd> <fb> <hi> <lo> <chk> <chk> EF.
+    0x41 = ACK (sent when the command's feedback byte is 1), 0x40 = error.
+    """
+    FRAME_LEN = 10
+    ACK   = 0x41
+    ERROR = 0x40
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    @staticmethod
+    def checksum_ok(frame) -> bool:
+        chk = (0x10000 - sum(frame[1:7])) & 0xFFFF
+        return frame[7] == chk >> 8 and frame[8] == chk & 0xFF
+
+    def feed(self, data: bytes):
+        self._buf += data
+        replies = []
+        while len(self._buf) >= self.FRAME_LEN:
+            start = self._buf.find(0x7E)
+            if start < 0:
+                self._buf.clear()
+                break
+            del self._buf[:start]
+            if len(self._buf) < self.FRAME_LEN:
+                break
+            frame = bytes(self._buf[:self.FRAME_LEN])
+            if frame[9] != 0xEF or not self.checksum_ok(frame):
+                del self._buf[0]   # resync on the next start byte
+                continue
+            del self._buf[:self.FRAME_LEN]
+            replies.append(Reply(frame[3], (frame[5] << 8) | frame[6], frame))
+        return replies
+
+    def is_ack(self, reply) -> bool:
+        return reply.kind == self.ACK
+
+    def is_error(self, reply) -> bool:
+        return reply.kind == self.ERROR
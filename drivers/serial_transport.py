@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+SerialTransport:
+  One writer thread and queue per serial port, shared by every driver that
+  talks to that port. write() only enqueues, so a mood change or cinematic
+  cue costs the caller microseconds. The writer drains everything queued in
+  the same tick into a single ser.write(), replaces still-pending packets
+  that carry the same coalescing key (e.g. two brightness changes → the
+  latest one), enforces per-device pacing instead of blanket sleeps, and
+  keeps enqueue→write latency metrics.
+
+  A reader thread parses device replies with the port's protocol (see
+  serial_protocols.py), matches ACKs to commands sent with ack=True (retrying
+  on timeout), and tracks health. A port that disappears — e.g. a USB
+  adapter re-enumerating — is reopened automatically; while a device is
+  disconnected or unresponsive, write() refuses new packets instead of
+  queueing them onto a dead device.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import serial
+
+from serial_protocols import LineProtocol
+
+# Device states
+CONNECTING   = 'connecting'     # not opened yet
+CONNECTED    = 'connected'
+UNRESPONSIVE = 'unresponsive'   # port open, but ACKs keep timing out
+DISCONNECTED = 'disconnected'   # port missing or lost; reopening in the background
+
+
+class SerialTransport:
+    def __init__(self, port, baudrate=115200, timeout=0.1, settle=0.0, min_gap=0.0,
+                 max_queue=256, retry_delay=1.0, alpha=0.2, protocol=None,
+                 ack_timeout=0.5, retries=1, max_failures=3, probe=None,
+                 probe_interval=2.0, usb_serial=None):
+        """
+        :param port:           Serial device path (prefer /dev/serial/by-id/…)
+        :param baudrate:       Baud rate
+        :param timeout:        pyserial read timeout (capped at ack_timeout / 2)
+        :param settle:         Seconds to wait after opening (board reset/boot)
+        :param min_gap:        Minimum seconds between packets (0 = batch freely)
+        :param max_queue:      Packets kept while the device is busy; the oldest
+                               are dropped beyond this
+        :param retry_delay:    Seconds between attempts to (re)open the port
+        :param alpha:          Smoothing factor for the latency averages
+        :param protocol:       Reply parser (default: newline-terminated text)
+        :param ack_timeout:    Seconds to wait for the ACK of an ack=True packet
+        :param retries:        Resends of an unacknowledged packet
+        :param max_failures:   Consecutive ACK failures before the device is
+                               marked unresponsive
+        :param probe:          Packet (expecting an ACK) sent every probe_interval
+                               while unresponsive, to detect recovery; without
+                               one, a single write per probe_interval is let
+                               through (with ack=True) instead
+        :param usb_serial:     USB serial number used to find the device again if
+                               it re-enumerates under a different path
+        """
+        self.port     = port
+        self.name     = os.path.basename(port)
+        self.baudrate = baudrate
+        self.timeout  = timeout
+        self.settle   = settle
+        self.min_gap  = min_gap
+        self.protocol = protocol or LineProtocol()
+        self.running  = True
+        self.state    = CONNECTING
+
+        self._max_queue      = max_queue
+        self._retry_delay    = retry_delay
+        self._alpha          = alpha
+        self._ack_timeout    = ack_timeout
+        self._retries        = retries
+        self._max_failures   = max_failures
+        self._probe          = bytes(probe) if probe else None
+        self._probe_interval = probe_interval
+        self._usb_serial     = usb_serial
+
+        self._ser      = None
+        self._queue    = deque()   # [key, data, enqueued_at, ack, attempts]
+        self._keyed    = {}        # coalescing key → pending queue entry
+        self._awaiting = deque()   # [entry, sent_at, deadline] in send order
+        self._inflight = 0
+        self._failures = 0
+        self._cond     = threading.Condition()
+        self._last_write = 0.0
+        self._last_reply = None
+        self._next_probe = 0.0     # probe-less: when the next write may go through
+        self._ever_connected = False
+        self._listeners = []
+
+        self._latency_ms     = None
+        self._max_latency_ms = 0.0
+        self._ack_ms         = None
+        self._stats = {'packets': 0, 'writes': 0, 'bytes': 0, 'coalesced': 0,
+                       'dropped': 0, 'rejected': 0, 'errors': 0, 'replies': 0,
+                       'acks': 0, 'nacks': 0, 'ack_timeouts': 0, 'retries': 0,
+                       'reconnects': 0}
+
+        threading.Thread(target=self._loop, daemon=True,
+                         name=f"serial-{self.name}").start()
+        threading.Thread(target=self._read_loop, daemon=True,
+                         name=f"serial-{self.name}-rx").start()
+
+    def write(self, data: bytes, key=None, ack=False) -> bool:
+        """
+        Queue `data` for the port and return immediately. If a packet with the
+        same `key` is still waiting, it is replaced in place instead. With
+        ack=True the device must acknowledge it (see the protocol) or it is
+        resent. Returns False if the device is disconnected or unresponsive.
+        """
+        with self._cond:
+            if not self.accepting:
+                self._stats['rejected'] += 1
+                return False
+            if self.state == UNRESPONSIVE:
+                # No probe packet: this write is the probe, its ACK the recovery signal
+                self._next_probe = time.monotonic() + self._probe_interval
+                ack = True
+            if key is not None:
+                entry = self._keyed.get(key)
+                if entry is not None:
+                    entry[1] = bytes(data)
+                    entry[3] = entry[3] or ack
+                    self._stats['coalesced'] += 1
+                    return True
+            if len(self._queue) >= self._max_queue:
+                dropped = self._queue.popleft()
+                if dropped[0] is not None:
+                    self._keyed.pop(dropped[0], None)
+                self._stats['dropped'] += 1
+            entry = [key, bytes(data), time.monotonic(), ack, 0]
+            self._queue.append(entry)
+            if key is not None:
+                self._keyed[key] = entry
+            self._cond.notify_all()
+        return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until everything queued so far has been written."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._queue and not self._inflight, timeout)
+
+    def close(self):
+        """Stop both threads and close the port."""
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+
+    def add_listener(self, callback):
+        """callback(reply) for every parsed reply, run on the reader thread."""
+        self._listeners.append(callback)
+
+    @property
+    def connected(self) -> bool:
+        return self._ser is not None
+
+    @property
+    def accepting(self) -> bool:
+        """
+        True while packets may be queued: device opening or healthy, or
+        unresponsive without a probe packet and due for a probing write.
+        """
+        if self.state == UNRESPONSIVE and self._probe is None:
+            return time.monotonic() >= self._next_probe
+        return self.state in (CONNECTING, CONNECTED)
+
+    @property
+    def healthy(self) -> bool:
+        return self.state == CONNECTED
+
+    # ---- connection management ----
+
+    def _set_state(self, state):
+        """Change state (lock held); returns True if it changed."""
+        if self.state == state:
+            return False
+        print(f"[SerialTransport] {self.port}: {self.state} → {state}")
+        self.state = state
+        return True
+
+    def _resolve_port(self) -> str:
+        """Current device path; follows the USB serial number after re-enumeration."""
+        if os.path.exists(self.port) or not self._usb_serial:
+            return self.port
+        from serial.tools import list_ports
+        for info in list_ports.comports():
+            if info.serial_number == self._usb_serial:
+                return info.device
+        return self.port
+
+    def _open(self) -> bool:
+        path = self._resolve_port()
+        try:
+            ser = serial.Serial(path, self.baudrate,
+                                timeout=min(self.timeout, self._ack_timeout / 2))
+        except (serial.SerialException, OSError) as e:
+            with self._cond:
+                changed = self._set_state(DISCONNECTED)
+            if changed:
+                print(f"[SerialTransport] {path} unavailable: {e}")
+                _notify_health(self)
+            return False
+        if self.settle:
+            time.sleep(self.settle)   # board resets on open; only this thread waits
+        with self._cond:
+            self._ser = ser
+            self._failures = 0
+            if self._ever_connected:
+                self._stats['reconnects'] += 1
+            self._ever_connected = True
+            self._set_state(CONNECTED)
+            self._cond.notify_all()
+        print(f"[SerialTransport] Opened {path} @ {self.baudrate}")
+        _notify_health(self)
+        return True
+
+    def _lost(self, ser, reason):
+        """Drop a failed port; the writer thread reopens it."""
+        with self._cond:
+            if self._ser is not ser:
+                return   # already handled by the other thread
+            print(f"[SerialTransport] Lost {self.port}: {reason}")
+            try:
+                ser.close()
+            except (serial.SerialException, OSError):
+                pass
+            self._ser = None
+            self._stats['errors'] += 1
+            # Nothing queued for a dead device survives the disconnect
+            self._stats['dropped'] += len(self._queue)
+            self._queue.clear()
+            self._keyed.clear()
+            self._awaiting.clear()
+            self._inflight = 0
+            self._set_state(DISCONNECTED)
+            self._cond.notify_all()
+        _notify_health(self)
+
+    # ---- writer ----
+
+    def _take(self):
+        """Wait for queued packets and return the next batch to write."""
+        with self._cond:
+            while not (self._queue or self._ser is None or not self.running):
+                if self._probe and self.state == UNRESPONSIVE:
+                    # Nothing is accepted meanwhile; probe to detect recovery
+                    if not self._cond.wait(self._probe_interval) and \
+                            self.state == UNRESPONSIVE:
+                        self._inflight = 1
+                        return [[None, self._probe, time.monotonic(), True, 0]]
+                else:
+                    self._cond.wait()
+            if not self.running or self._ser is None:
+                return []
+            if self.min_gap > 0:
+                batch = [self._queue.popleft()]
+            else:
+                batch = list(self._queue)
+                self._queue.clear()
+            for entry in batch:
+                if entry[0] is not None:
+                    self._keyed.pop(entry[0], None)
+            self._inflight = len(batch)
+        return batch
+
+    def _loop(self):
+        while self.running:
+            if self._ser is None and not self._open():
+                with self._cond:
+                    self._cond.wait_for(lambda: not self.running, self._retry_delay)
+                continue
+
+            batch = self._take()
+            ser   = self._ser
+            if not batch or ser is None:
+                continue
+            if self.min_gap > 0:
+                # Device-specific pacing, paid by the writer thread only
+                wait = self._last_write + self.min_gap - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+
+            payload = b''.join(entry[1] for entry in batch)
+            try:
+                ser.write(payload)
+            except (serial.SerialException, OSError) as e:
+                self._lost(ser, f"write failed: {e}")
+                continue
+
+            now = time.monotonic()
+            self._last_write = now
+            with self._cond:
+                for entry in batch:
+                    if entry[3]:
+                        self._awaiting.append([entry, now, now + self._ack_timeout])
+                    if entry[4]:
+                        continue   # a resend; latency was counted the first time
+                    ms = (now - entry[2]) * 1000.0
+                    self._latency_ms = ms if self._latency_ms is None else \
+                        self._latency_ms + self._alpha * (ms - self._latency_ms)
+                    self._max_latency_ms = max(self._max_latency_ms, ms)
+                self._stats['packets'] += len(batch)
+                self._stats['writes']  += 1
+                self._stats['bytes']   += len(payload)
+                self._inflight = 0
+                self._cond.notify_all()
+
+        with self._cond:
+            ser, self._ser = self._ser, None
+        if ser is not None:
+            ser.close()
+
+    # ---- reader ----
+
+    def _read_loop(self):
+        while self.running:
+            ser = self._ser
+            if ser is None:
+                with self._cond:
+                    self._cond.wait_for(
+                        lambda: self._ser is not None or not self.running, 0.5)
+                continue
+            try:
+                data = ser.read(ser.in_waiting or 1)
+            except (serial.SerialException, OSError, TypeError) as e:
+                # TypeError/OSError: pyserial's view of a vanished USB device
+                self._lost(ser, f"read failed: {e}")
+                continue
+            if data:
+                for reply in self.protocol.feed(data):
+                    self._on_reply(reply)
+            self._expire_acks()
+
+    def _on_reply(self, reply):
+        now = time.monotonic()
+        changed = False
+        with self._cond:
+            self._last_reply = now
+            self._stats['replies'] += 1
+            self._failures = 0
+            if self.state == UNRESPONSIVE:
+                changed = self._set_state(CONNECTED)
+            is_ack, is_error = self.protocol.is_ack(reply), self.protocol.is_error(reply)
+            if (is_ack or is_error) and self._awaiting:
+                _, sent_at, _ = self._awaiting.popleft()
+                if is_ack:
+                    ms = (now - sent_at) * 1000.0
+                    self._ack_ms = ms if self._ack_ms is None else \
+                        self._ack_ms + self._alpha * (ms - self._ack_ms)
+                    self._stats['acks'] += 1
+                else:
+                    self._stats['nacks'] += 1
+        if changed:
+            _notify_health(self)
+        for callback in list(self._listeners):
+            try:
+                callback(reply)
+            except Exception as e:
+                print(f"[SerialTransport] Reply listener failed: {e}")
+
+    def _expire_acks(self):
+        """Resend or give up on packets whose ACK didn't arrive in time."""
+        now = time.monotonic()
+        changed = False
+        with self._cond:
+            while self._awaiting and self._awaiting[0][2] <= now:
+                entry, _, _ = self._awaiting.popleft()
+                superseded = entry[0] is not None and entry[0] in self._keyed
+                if entry[4] < self._retries and not superseded and self.accepting:
+                    entry[4] += 1
+                    self._queue.appendleft(entry)
+                    self._stats['retries'] += 1
+                    self._cond.notify_all()
+                    continue
+                self._stats['ack_timeouts'] += 1
+                self._failures += 1
+                if self._failures >= self._max_failures and self.state == CONNECTED:
+                    changed = self._set_state(UNRESPONSIVE)
+                    self._next_probe = now + self._probe_interval
+                    self._stats['dropped'] += len(self._queue)
+                    self._queue.clear()
+                    self._keyed.clear()
+                    self._cond.notify_all()   # writer switches to probing
+        if changed:
+            _notify_health(self)
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats['queue_depth']  = len(self._queue)
+            stats['awaiting_ack'] = len(self._awaiting)
+        stats.update(
+            port           = self.port,
+            state          = self.state,
+            connected      = self.connected,
+            latency_ms     = round(self._latency_ms, 2) if self._latency_ms is not None else None,
+            max_latency_ms = round(self._max_latency_ms, 2),
+            ack_latency_ms = round(self._ack_ms, 2) if self._ack_ms is not None else None,
+            last_reply_s   = round(time.monotonic() - self._last_reply, 1)
+                             if self._last_reply is not None else None
+        )
+        return stats
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+_health_listeners = []
+
+def get_transport(port: str, **kwargs) -> SerialTransport:
+    """
+    Shared SerialTransport for `port`, created on first use with `kwargs`.
+    Drivers on the same port (e.g. HoloDriver and PeriscopeDriver) share it.
+    """
+    with _transports_lock:
+        transport = _transports.get(port)
+        if transport is None:
+            transport = _transports[port] = SerialTransport(port, **kwargs)
+        return transport
+
+def transport_stats() -> dict:
+    """Stats of every open transport, keyed by port."""
+    with _transports_lock:
+        transports = list(_transports.values())
+    return {t.port: t.get_stats() for t in transports}
+
+def subscribe_health(callback):
+    """callback(transport) whenever any transport changes state."""
+    _health_listeners.append(callback)
+
+def _notify_health(transport):
+    for callback in list(_health_listeners):
+        try:
+            callback(transport)
+        except Exception as e:
+            print(f"[SerialTransport] Health listener failed: {e}")
@@ -1,35 +1,200 @@
 #!/usr/bin/env python3
-import serial, time
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from serial_protocols import DFPlayerProtocol
+from serial_transport import get_transport
+
+CATALOG_PATH = Path(__file__).resolve().parent.parent / "sounds" / "catalog.json"
+
+# DFPlayer commands
+CMD_PLAY   = 0x03
+CMD_VOLUME = 0x06
+CMD_PAUSE  = 0x0E
+CMD_RESUME = 0x0D
+CMD_STOP   = 0x16
+CMD_STATUS = 0x42
+# Unsolicited "track finished" replies (USB, SD card, flash)
+FINISHED   = (0x3C, 0x3D, 0x3E)
+
+# play() modes when something is already playing
+PREEMPT = 'preempt'   # cut the current sound
+QUEUE   = 'queue'     # play after the current sound finishes
+SKIP    = 'skip'      # drop the request
 
 class SoundDriver:
     """
     Serial sound driver for DFPlayer (or similar).
+    Sounds are addressed by logical name through sounds/catalog.json; every
+    packet is built once at load time, so a cue is a dict lookup and an enqueue.
     """
-    def __init__(self, port='/dev/ttyTHS1', baudrate=9600, timeout=1):
-        self.ser = serial.Serial(port, baudrate, timeout=timeout)
-        time.sleep(2)
-
-    def _send(self, pkt: bytes):
-        self.ser.write(pkt)
-        time.sleep(0.05)
-
-    def play_mp3(self, filename: str):
-        idx = int(filename.split('/')[-1][:4])
-        hi, lo = (idx>>8)&0xFF, idx&0xFF
-        pkt = bytearray([0x7E,0xFF,0x06,0x03,0x00,hi,lo,0x00,0x00,0xEF])
+    def __init__(self, port='/dev/ttyTHS1', baudrate=9600, timeout=1,
+                 catalog_path=CATALOG_PATH):
+        # DFPlayer boots for ~2 s after open and drops commands sent <50 ms apart;
+        # both waits happen on the transport's writer thread. Every command asks
+        # for an ACK (feedback byte = 1); a status query probes a silent player.
+        self.transport = get_transport(port, baudrate=baudrate, timeout=timeout,
+                                       settle=2, min_gap=0.05,
+                                       protocol=DFPlayerProtocol(),
+                                       probe=self._packet(CMD_STATUS, 0))
+
+        # Fixed packets
+        self._volume_packets = [self._packet(CMD_VOLUME, v) for v in range(31)]
+        self._stop_packet    = self._packet(CMD_STOP, 0)
+        self._pause_packet   = self._packet(CMD_PAUSE, 0)
+        self._resume_packet  = self._packet(CMD_RESUME, 0)
+        self._status_packet  = self._packet(CMD_STATUS, 0)
+
+        # Playback state, updated from the player's replies
+        self._lock       = threading.Lock()
+        self._queue      = deque()   # track indices waiting for the current one
+        self._current    = None      # track index playing (None = idle)
+        self._started_at = None
+        self._status_at  = None
+
+        self.catalog_path = Path(catalog_path)
+        self.catalog = {}
+        self.reload_catalog()
+
+        # Last: the (shared) transport's reader thread may already be running
+        self.transport.add_listener(self._on_reply)
+
+    @staticmethod
+    def _packet(cmd: int, param: int) -> bytes:
+        pkt = bytearray([0x7E,0xFF,0x06,cmd,0x01,(param>>8)&0xFF,param&0xFF,0x00,0x00,0xEF])
         chk = 0xFFFF - sum(pkt[1:7]) + 1
         pkt[7], pkt[8] = (chk>>8)&0xFF, chk&0xFF
-        self._send(pkt)
+        return bytes(pkt)
+
+    def reload_catalog(self):
+        """(Re)load the sound catalogue and rebuild the play packets."""
+        catalog = json.loads(self.catalog_path.read_text()) if self.catalog_path.exists() else {}
+        self.catalog       = catalog
+        self._names        = {name: e['track'] for name, e in catalog.items()}
+        self._files        = {e['file']: e['track'] for e in catalog.values() if 'file' in e}
+        self._track_names  = {e['track']: name for name, e in catalog.items()}
+        self._play_packets = {e['track']: self._packet(CMD_PLAY, e['track'])
+                              for e in catalog.values()}
+        print(f"[SoundDriver] Loaded {len(catalog)} sounds from {self.catalog_path}")
+
+    def _send(self, pkt: bytes, key=None) -> bool:
+        return self.transport.write(pkt, key, ack=True)
+
+    def _play_packet(self, track: int) -> bytes:
+        pkt = self._play_packets.get(track)
+        if pkt is None:
+            # Track on the card but not in the catalogue: build once, keep
+            pkt = self._play_packets[track] = self._packet(CMD_PLAY, track)
+        return pkt
+
+    def play_track(self, track: int, mode: str = PREEMPT) -> bool:
+        """Play SD-card track `track`; `mode` decides what happens if busy."""
+        with self._lock:
+            busy = self._current is not None
+            if busy and mode == SKIP:
+                return False
+            if busy and mode == QUEUE:
+                self._queue.append(track)
+                return True
+            if mode == PREEMPT:
+                self._queue.clear()
+            started = (track, time.monotonic())
+            self._current, self._started_at = started
+        return self._start(track, started)
+
+    def _start(self, track: int, started) -> bool:
+        """Send the play command; if the transport refuses it, don't report it as playing."""
+        if self._send(self._play_packet(track)):
+            return True
+        with self._lock:
+            if (self._current, self._started_at) == started:
+                self._current = self._started_at = None
+        return False
+
+    def play(self, name: str, mode: str = PREEMPT) -> bool:
+        """Play a sound by its catalogue name."""
+        track = self._names.get(name)
+        if track is None:
+            print(f"[SoundDriver] Unknown sound '{name}'")
+            return False
+        return self.play_track(track, mode)
+
+    def play_mp3(self, filename: str, mode: str = PREEMPT) -> bool:
+        """Play by file name: catalogue lookup, else the 4-digit track prefix."""
+        base  = filename.split('/')[-1]
+        track = self._files.get(base)
+        if track is None:
+            if not base[:4].isdigit():
+                # e.g. a generated TTS file — not on the player's SD card;
+                # TTSDriver plays those through a local audio player instead
+                print(f"[SoundDriver] '{base}' is not a DFPlayer track")
+                return False
+            track = int(base[:4])
+        return self.play_track(track, mode)
 
     def set_volume(self, level:int):
         level = max(0,min(30,level))
-        pkt = bytearray([0x7E,0xFF,0x06,0x06,0x00,0x00,level,0x00,0x00,0xEF])
-        chk = 0xFFFF - sum(pkt[1:7]) + 1
-        pkt[7], pkt[8] = (chk>>8)&0xFF, chk&0xFF
-        self._send(pkt)
+        self._send(self._volume_packets[level], key='volume')
 
     def stop(self):
-        pkt = bytearray([0x7E,0xFF,0x06,0x16,0x00,0x00,0x00,0x00,0x00,0xEF])
-        chk = 0xFFFF - sum(pkt[1:7]) + 1
-        pkt[7], pkt[8] = (chk>>8)&0xFF, chk&0xFF
-        self._send(pkt)
+        """Stop playback and drop anything queued."""
+        with self._lock:
+            self._queue.clear()
+            self._current = None
+        self._send(self._stop_packet)
+
+    def pause(self):
+        self._send(self._pause_packet)
+
+    def resume(self):
+        self._send(self._resume_packet)
+
+    def query_state(self):
+        """Ask the player for its status; the answer updates get_state()."""
+        self._send(self._status_packet, key='status')
+
+    @property
+    def playing(self) -> bool:
+        return self._current is not None
+
+    def get_state(self) -> dict:
+        with self._lock:
+            track = self._current
+            entry = self.catalog.get(self._track_names.get(track), {})
+            return {
+                'playing':     track is not None,
+                'track':       track,
+                'name':        self._track_names.get(track),
+                'elapsed_ms':  int((time.monotonic() - self._started_at) * 1000)
+                               if track is not None else None,
+                'duration_ms': entry.get('duration_ms'),
+                'queued':      [self._track_names.get(t, t) for t in self._queue],
+                'status_age_s': round(time.monotonic() - self._status_at, 1)
+                                if self._status_at is not None else None
+            }
+
+    def _on_reply(self, reply):
+        """Reader-thread callback: track player state, start queued sounds."""
+        next_track = None
+        with self._lock:
+            if reply.kind in FINISHED:
+                # The player often reports the same finish twice
+                finished = self._current is not None and reply.value == self._current
+            elif reply.kind == CMD_STATUS:
+                self._status_at = time.monotonic()
+                # Low byte: 0 stopped, 1 playing, 2 paused
+                finished = self._current is not None and reply.value & 0xFF == 0
+            else:
+                return
+            if not finished:
+                return
+            self._current = None
+            if self._queue:
+                next_track = self._queue.popleft()
+                started = (next_track, time.monotonic())
+                self._current, self._started_at = started
+        if next_track is not None:
+            self._start(next_track, started)
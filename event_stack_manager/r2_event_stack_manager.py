@@ -1,86 +1,340 @@
 #!/usr/bin/env python3
 """
 EventStackManager:
-  Queues up and processes events in order—mood changes, profiles, cinematics, quick moods.
+  Schedules and processes events—mood changes, profiles, cinematics, quick moods.
+  Events are ordered by priority and due time; the worker sleeps on a condition
+  variable until the next event is due, so nothing is polled.
   Runs in a daemon thread so it never blocks your Flask API.
 """
 
-import time
+import heapq
+import itertools
 import threading
+import time
+
+# Lower number = dispatched first
+PRIORITY_EMERGENCY = 0
+PRIORITY_HIGH      = 10
+PRIORITY_NORMAL    = 50
+
+# add_event() results
+QUEUED    = 'queued'     # added to the stack
+COALESCED = 'coalesced'  # merged into an already-queued event
+DROPPED   = 'dropped'    # duplicate within its coalescing window
+REJECTED  = 'rejected'   # stack full under the 'reject' overflow policy
+
+# Event types handled by the worker loop
+EVENT_TYPES = ('mood', 'profile', 'cinematic', 'quick_mood')
 
 class EventStackManager:
-    def __init__(self, profile_manager, mood_manager, cinematic_manager):
+    def __init__(self, profile_manager, mood_manager, cinematic_manager,
+                 max_depth=64, overflow_policy='reject'):
+        """
+        :param max_depth:       Maximum number of queued events
+        :param overflow_policy: 'reject' refuses new events when full,
+                                'drop_oldest' evicts the oldest non-emergency event
+        """
         self.pm = profile_manager
         self.mm = mood_manager
         self.cm = cinematic_manager
 
-        self._stack = []
-        self._lock = threading.Lock()
+        # Due events: heap of (priority, seq, due, event_type, data)
+        self._ready   = []
+        # Future events: heap of (due, seq, priority, event_type, data)
+        self._pending = []
+        self._seq     = itertools.count()
+        self._cond    = threading.Condition()
         self._running = False
+        # Normal events wait until the previous event's post-delay has elapsed
+        self._busy_until = 0.0
+
+        self.max_depth       = max_depth
+        self.overflow_policy = overflow_policy
+        # seq and event_type of the most recently queued event
+        self._last_queued = (None, None)
+        # (event_type, data) -> monotonic time last accepted, for window rules
+        self._recent = {}
+        self._stats  = {QUEUED: 0, COALESCED: 0, DROPPED: 0, REJECTED: 0}
+        self._subscribers = []
+
+        # Seconds to hold after each event type before the next one runs
+        self.post_delays = {
+            'mood':       0.5,
+            'quick_mood': 0.5,
+            'cinematic':  0.5,
+            'profile':    0.0
+        }
+        self.default_priorities = {
+            'profile':    PRIORITY_HIGH,
+            'mood':       PRIORITY_NORMAL,
+            'quick_mood': PRIORITY_NORMAL,
+            'cinematic':  PRIORITY_NORMAL
+        }
+        # Applied to immediate events only; timed events are never coalesced.
+        #   'latest': a run of consecutive events of this type collapses to the newest
+        #   'window': identical events within `window` seconds are dropped
+        self.coalesce_rules = {
+            'mood':       {'mode': 'latest'},
+            'quick_mood': {'mode': 'latest'},
+            'cinematic':  {'mode': 'window', 'window': 10.0}
+        }
+
+    def _priority_for(self, event_type: str, data: str) -> int:
+        if event_type == 'profile' and data == 'Emergency':
+            return PRIORITY_EMERGENCY
+        return self.default_priorities.get(event_type, PRIORITY_NORMAL)
+
+    def subscribe(self, callback):
+        """Call callback(stack_snapshot) whenever the queue changes."""
+        with self._cond:
+            self._subscribers.append(callback)
+
+    def _notify(self):
+        """Run subscriber callbacks; must be called without holding _cond."""
+        if not self._subscribers:
+            return
+        stack = self.get_current_stack()
+        for callback in list(self._subscribers):
+            try:
+                callback(stack)
+            except Exception as e:
+                print(f"[EventStackManager] Subscriber error: {e}")
+
+    def add_event(self, event_type: str, data: str, priority: int = None,
+                  delay: float = 0.0, at: float = None, coalesce: bool = True) -> str:
+        """
+        Schedule an event and return QUEUED, COALESCED, DROPPED or REJECTED.
+        :param priority: Override the event type's default priority (lower runs first)
+        :param delay:    Seconds from now before the event becomes due
+        :param at:       Absolute time.monotonic() due time (overrides delay)
+        :param coalesce: Apply coalesce_rules (only for immediate events)
+        """
+        result = self._add_event(event_type, data, priority, delay, at, coalesce)
+        if result in (QUEUED, COALESCED):
+            self._notify()
+        return result
+
+    def _add_event(self, event_type, data, priority, delay, at, coalesce) -> str:
+        if priority is None:
+            priority = self._priority_for(event_type, data)
+        now = time.monotonic()
+        due = at if at is not None else now + delay
+        immediate = at is None and delay <= 0
+
+        with self._cond:
+            rule = self.coalesce_rules.get(event_type) if coalesce and immediate else None
+            if rule and rule['mode'] == 'latest' and self._replace_last(event_type, data):
+                print(f"[EventStackManager] Coalesced event: {event_type} -> {data}")
+                return self._count(COALESCED)
+            if rule and rule['mode'] == 'window':
+                last = self._recent.get((event_type, data))
+                if last is not None and now - last < rule['window']:
+                    print(f"[EventStackManager] Dropping duplicate event: {event_type} -> {data}")
+                    return self._count(DROPPED)
+
+            if self._depth() >= self.max_depth and priority > PRIORITY_EMERGENCY:
+                if self.overflow_policy != 'drop_oldest' or not self._evict_oldest():
+                    print(f"[EventStackManager] Stack full → rejecting {event_type} -> {data}")
+                    return self._count(REJECTED)
 
-    def add_event(self, event_type: str, data: str):
-        """Add an event tuple (event_type, data) to the queue."""
-        with self._lock:
             print(f"[EventStackManager] Queueing event: {event_type} -> {data}")
-            self._stack.append((event_type, data))
+            seq = next(self._seq)
+            heapq.heappush(self._pending, (due, seq, priority, event_type, data))
+            self._last_queued = (seq, event_type)
+            if rule and rule['mode'] == 'window':
+                self._recent[(event_type, data)] = now
+            self._cond.notify()
+            return self._count(QUEUED)
+
+    def add_events(self, events, start: float = None) -> str:
+        """
+        Enqueue a whole sequence under a single lock acquire; returns QUEUED or
+        REJECTED (all-or-nothing). `events` holds (event_type, data, at_ms)
+        tuples: at_ms is an offset from `start` (default now), None means
+        "in order". Steps share one priority so file order is preserved.
+        """
+        result = self._add_events(events, start)
+        if result == QUEUED:
+            self._notify()
+        return result
+
+    def _add_events(self, events, start) -> str:
+        now   = time.monotonic()
+        start = now if start is None else start
+        with self._cond:
+            overflow = self._depth() + len(events) - self.max_depth
+            if overflow > 0:
+                if self.overflow_policy != 'drop_oldest':
+                    print(f"[EventStackManager] Stack full → rejecting {len(events)}-event sequence")
+                    return self._count(REJECTED)
+                for _ in range(overflow):
+                    if not self._evict_oldest():
+                        print(f"[EventStackManager] Stack full → rejecting {len(events)}-event sequence")
+                        return self._count(REJECTED)
+
+            for e_type, data, at_ms in events:
+                priority = PRIORITY_EMERGENCY if self._priority_for(e_type, data) == PRIORITY_EMERGENCY \
+                    else PRIORITY_NORMAL
+                due = start if at_ms is None else start + at_ms / 1000.0
+                self._pending.append((due, next(self._seq), priority, e_type, data))
+            heapq.heapify(self._pending)
+            self._last_queued = (None, None)
+            self._stats[QUEUED] += len(events)
+            print(f"[EventStackManager] Queued {len(events)}-event sequence")
+            self._cond.notify()
+            return QUEUED
+
+    def _count(self, result: str) -> str:
+        self._stats[result] += 1
+        return result
+
+    def _depth(self) -> int:
+        return len(self._ready) + len(self._pending)
+
+    def _replace_last(self, event_type: str, data: str) -> bool:
+        """Swap the data of the most recently queued event if it is still waiting
+        and of the same type. Heap keys are unchanged, so heap order holds."""
+        last_seq, last_type = self._last_queued
+        if last_type != event_type:
+            return False
+        for heap in (self._ready, self._pending):
+            for i, entry in enumerate(heap):
+                if entry[1] == last_seq:
+                    heap[i] = entry[:4] + (data,)
+                    return True
+        return False
+
+    def _evict_oldest(self) -> bool:
+        """Remove the earliest-queued non-emergency event; False if none exists."""
+        candidates = [(entry[1], heap, i)
+                      for heap, prio_idx in ((self._ready, 0), (self._pending, 2))
+                      for i, entry in enumerate(heap)
+                      if entry[prio_idx] > PRIORITY_EMERGENCY]
+        if not candidates:
+            return False
+        seq, heap, i = min(candidates, key=lambda c: c[0])
+        entry = heap.pop(i)
+        heapq.heapify(heap)
+        print(f"[EventStackManager] Stack full → evicting {entry[3]} -> {entry[4]}")
+        self._stats[DROPPED] += 1
+        return True
+
+    def get_queue_depth(self) -> int:
+        """Number of events currently waiting."""
+        with self._cond:
+            return self._depth()
+
+    def get_stats(self) -> dict:
+        """Queue depth, limit and per-result counters since startup."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({'depth': self._depth(), 'max_depth': self.max_depth,
+                          'overflow_policy': self.overflow_policy})
+            return stats
 
     def start(self):
         """Begin processing the stack in a daemon thread."""
-        if not self._running:
+        with self._cond:
+            if self._running:
+                return
             print("[EventStackManager] Starting event loop")
             self._running = True
-            thread = threading.Thread(target=self._loop, daemon=True)
-            thread.start()
+        thread = threading.Thread(target=self._loop, daemon=True)
+        thread.start()
 
     def stop_stack(self):
-        """Stop processing and clear pending events."""
+        """Clear pending events and cancel any post-event delay."""
         print("[EventStackManager] Stopping and clearing stack")
-        self._running = False
-        with self._lock:
-            self._stack.clear()
+        with self._cond:
+            self._ready.clear()
+            self._pending.clear()
+            self._recent.clear()
+            self._last_queued = (None, None)
+            self._busy_until = 0.0
+            self._cond.notify()
+        self._notify()
+
+    def shutdown(self):
+        """Clear the stack and terminate the worker thread."""
+        self.stop_stack()
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def _promote_due(self, now: float):
+        """Move every pending event whose due time has passed into the ready heap."""
+        while self._pending and self._pending[0][0] <= now:
+            due, seq, priority, e_type, data = heapq.heappop(self._pending)
+            heapq.heappush(self._ready, (priority, seq, due, e_type, data))
+
+    def _next_event(self):
+        """Block until an event may run; return it, or None when shut down."""
+        with self._cond:
+            while self._running:
+                now = time.monotonic()
+                self._promote_due(now)
+                if self._ready and (self._ready[0][0] <= PRIORITY_EMERGENCY
+                                    or now >= self._busy_until):
+                    priority, seq, due, e_type, data = heapq.heappop(self._ready)
+                    return e_type, data
+
+                deadlines = []
+                if self._ready:
+                    deadlines.append(self._busy_until)
+                if self._pending:
+                    deadlines.append(self._pending[0][0])
+                timeout = max(0.0, min(deadlines) - now) if deadlines else None
+                self._cond.wait(timeout)
+        return None
 
     def _loop(self):
-        while self._running:
-            event = None
-            with self._lock:
-                if self._stack:
-                    event = self._stack.pop(0)
-
-            if event:
-                e_type, data = event
-                current_profile = self.pm.get_profile()
-                print(f"[EventStackManager] Handling event: {e_type} -> {data} (Profile={current_profile})")
-
-                try:
-                    if e_type == 'mood':
-                        # KidEvent block for MAD/SCARED
-                        if current_profile == 'KidEvent' and data in ['MAD', 'SCARED']:
-                            data = 'FRIENDLY'
-                        self.mm.set_mood(data)
+        while True:
+            event = self._next_event()
+            if event is None:
+                return
+
+            e_type, data = event
+            self._notify()
+            # One consistent view of the profile for the whole event
+            profile = self.pm.snapshot()
+            current_profile = profile.name
+            print(f"[EventStackManager] Handling event: {e_type} -> {data} (Profile={current_profile})")
 
-                    elif e_type == 'profile':
-                        self.pm.set_profile(data)
+            try:
+                if e_type == 'mood':
+                    # KidEvent block for MAD/SCARED
+                    if current_profile == 'KidEvent' and data in ['MAD', 'SCARED']:
+                        data = 'FRIENDLY'
+                    self.mm.set_mood(data)
 
-                    elif e_type == 'cinematic':
-                        if self.pm.is_cinematic_enabled():
-                            self.cm.run_cinematic_sequence(data)
+                elif e_type == 'profile':
+                    self.pm.set_profile(data)
 
-                    elif e_type == 'quick_mood':
-                        if self.pm.is_quick_mood_enabled():
-                            self.mm.set_mood(data)
+                elif e_type == 'cinematic':
+                    if profile.cinematic_enabled:
+                        self.cm.run_cinematic_sequence(data)
 
-                    else:
-                        print(f"[EventStackManager] Unknown event type: {e_type}")
-                except Exception as ex:
-                    print(f"[EventStackManager] Error processing {e_type}: {ex}")
+                elif e_type == 'quick_mood':
+                    if profile.quick_mood_enabled:
+                        self.mm.set_mood(data)
 
-                # small delay between events
-                time.sleep(0.5)
+                else:
+                    print(f"[EventStackManager] Unknown event type: {e_type}")
+            except Exception as ex:
+                print(f"[EventStackManager] Error processing {e_type}: {ex}")
 
-            else:
-                time.sleep(0.1)
+            with self._cond:
+                self._busy_until = time.monotonic() + self.post_delays.get(e_type, 0.0)
 
     def get_current_stack(self):
-        """Return a snapshot list of pending events."""
-        with self._lock:
-            return [{'event_type': e, 'event_data': d} for e, d in self._stack]
+        """Return a snapshot list of pending events in dispatch order."""
+        with self._cond:
+            now = time.monotonic()
+            ready   = sorted(self._ready)
+            pending = sorted(self._pending)
+            stack = [{'event_type': e, 'event_data': d, 'priority': p, 'due_in': 0.0}
+                     for p, _, _, e, d in ready]
+            stack += [{'event_type': e, 'event_data': d, 'priority': p,
+                       'due_in': round(max(0.0, due - now), 3)}
+                      for due, _, p, e, d in pending]
+            return stack
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+SequenceLibrary:
+  Validates and compiles show sequences (sequences/<name>.json) up front and
+  keeps them cached in memory. A cached sequence is recompiled only when its
+  file's mtime changes, so loading a show is a stat() plus one bulk enqueue.
+"""
+
+import json
+import os
+from collections import namedtuple
+from pathlib import Path
+
+from r2_event_stack_manager import EVENT_TYPES
+
+SEQUENCE_DIR = Path(__file__).resolve().parent.parent / "sequences"
+
+# at_ms: optional offset from sequence start; None = run in order after the previous step
+Step = namedtuple('Step', ['event_type', 'event_data', 'at_ms'])
+
+class SequenceLibrary:
+    def __init__(self, profile_manager, mood_manager, cinematic_manager,
+                 sequence_dir=SEQUENCE_DIR):
+        self.pm = profile_manager
+        self.mm = mood_manager
+        self.cm = cinematic_manager
+        self.sequence_dir = Path(sequence_dir)
+
+        # name → (mtime_ns, tuple of Steps)
+        self._cache  = {}
+        # name → error message for files that failed to compile
+        self.errors  = {}
+
+    def compile_all(self):
+        """Compile every sequence file; returns {name: error} for the failures."""
+        self.errors = {}
+        for path in sorted(self.sequence_dir.glob('*.json')):
+            try:
+                self.get(path.stem)
+            except ValueError as e:
+                print(f"[SequenceLibrary] Invalid sequence '{path.stem}': {e}")
+        print(f"[SequenceLibrary] {len(self._cache)} sequences ready, {len(self.errors)} invalid")
+        return dict(self.errors)
+
+    def names(self):
+        """Names of all successfully compiled sequences."""
+        return sorted(self._cache)
+
+    def get(self, name: str):
+        """
+        Return the compiled steps for `name`.
+        Raises KeyError if the sequence does not exist and ValueError if it is invalid.
+        """
+        if not name or os.sep in name or name.startswith('.'):
+            raise KeyError(name)
+        path = self.sequence_dir / f"{name}.json"
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._cache.pop(name, None)
+            self.errors.pop(name, None)
+            raise KeyError(name)
+
+        cached = self._cache.get(name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            steps = self._compile(path)
+        except ValueError as e:
+            self._cache.pop(name, None)
+            self.errors[name] = str(e)
+            raise
+        self._cache[name] = (mtime, steps)
+        self.errors.pop(name, None)
+        return steps
+
+    def _compile(self, path: Path):
+        try:
+            raw = json.loads(path.read_text())
+        except json.JSONDecodeError as e:
+            raise ValueError(f"bad JSON: {e}")
+        if not isinstance(raw, list):
+            raise ValueError("sequence must be a list of events")
+
+        steps = []
+        for i, e in enumerate(raw):
+            if not isinstance(e, dict) or 'event_type' not in e or 'event_data' not in e:
+                raise ValueError(f"step {i}: missing event_type/event_data")
+            e_type, data = e['event_type'], e['event_data']
+            self._validate(i, e_type, data)
+            at_ms = e.get('at_ms')
+            if at_ms is not None and (not isinstance(at_ms, (int, float)) or at_ms < 0):
+                raise ValueError(f"step {i}: at_ms must be a non-negative number")
+            steps.append(Step(e_type, data, at_ms))
+        return tuple(steps)
+
+    def _validate(self, i: int, e_type: str, data: str):
+        if e_type not in EVENT_TYPES:
+            raise ValueError(f"step {i}: unknown event type '{e_type}'")
+        if e_type in ('mood', 'quick_mood') and data not in self.mm.valid_moods:
+            raise ValueError(f"step {i}: unknown mood '{data}'")
+        if e_type == 'profile' and data not in self.pm.profiles:
+            raise ValueError(f"step {i}: unknown profile '{data}'")
+        if e_type == 'cinematic' and data not in self.cm.allowed_sequences:
+            raise ValueError(f"step {i}: unknown cinematic '{data}'")
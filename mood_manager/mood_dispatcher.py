@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+MoodDispatcher:
+  Fans a mood change out to every light device (HP LEDs, PSI, logic
+  displays) at once. Each device has its own worker thread holding at most
+  one pending setting, so a burst of mood changes collapses to the last one
+  per device and a slow device never holds up the others — or the caller.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+OUTPUTS_PATH = Path(__file__).resolve().parent.parent / "moods" / "mood_outputs.json"
+
+# Weight of the newest sample in the moving average
+EWMA_ALPHA = 0.2
+
+
+class _Device:
+    def __init__(self, name, applier):
+        self.name      = name
+        self.applier   = applier
+        self.pending   = None    # (mood, setting, requested_at) or None
+        self.applied   = 0
+        self.collapsed = 0       # settings replaced before they were applied
+        self.errors    = 0
+        self.last_mood = None
+        self.last_ms   = None
+        self.avg_ms    = None
+        self.max_ms    = None
+
+
+class MoodDispatcher:
+    def __init__(self, appliers: dict, outputs_path=OUTPUTS_PATH):
+        """
+        :param appliers:     {device name: callable(setting)}, e.g. {'hp': ..., 'psi': ...};
+                             called on that device's worker thread
+        :param outputs_path: JSON table {mood: {device name: setting}}
+        """
+        self.outputs_path = Path(outputs_path)
+        self.outputs      = {}
+        self._cond        = threading.Condition()
+        self._devices     = {name: _Device(name, fn) for name, fn in appliers.items()}
+        self._spread      = {}   # completion tracking for the latest apply()
+        self.last_spread_ms = None
+        self._generation  = None   # newest generation passed to apply()
+        self.reload_outputs()
+        for device in self._devices.values():
+            threading.Thread(target=self._worker, args=(device,), daemon=True,
+                             name=f"mood-{device.name}").start()
+
+    def reload_outputs(self):
+        """(Re)load the mood → device output table."""
+        outputs = json.loads(self.outputs_path.read_text()) if self.outputs_path.exists() else {}
+        for mood, settings in outputs.items():
+            unknown = set(settings) - set(self._devices)
+            if unknown:
+                print(f"[MoodDispatcher] '{mood}': no device for {sorted(unknown)}")
+        self.outputs = outputs
+        print(f"[MoodDispatcher] Loaded outputs for {len(outputs)} moods from {self.outputs_path}")
+
+    def apply(self, mood_name: str, generation: int = None):
+        """
+        Queue every device's setting for `mood_name`; returns immediately.
+        :param generation: Caller's change counter; an apply() that lost a race
+                           to a newer generation is dropped
+        """
+        settings = self.outputs.get(mood_name)
+        if settings is None:
+            print(f"[MoodDispatcher] No outputs for mood '{mood_name}'")
+            return
+        now = time.monotonic()
+        with self._cond:
+            if generation is not None:
+                if self._generation is not None and generation <= self._generation:
+                    return
+                self._generation = generation
+            targets = [d for d in self._devices.values() if d.name in settings]
+            for device in targets:
+                if device.pending is not None:
+                    device.collapsed += 1
+                device.pending = (mood_name, settings[device.name], now)
+            self._spread = {'mood': mood_name, 'requested_at': now,
+                            'left': len(targets), 'first': None}
+            self._cond.notify_all()
+
+    def _worker(self, device):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: device.pending is not None)
+                mood, setting, requested_at = device.pending
+                device.pending = None
+            ok = True
+            try:
+                device.applier(setting)
+            except Exception as e:
+                ok = False
+                print(f"[MoodDispatcher] {device.name} failed for '{mood}': {e}")
+            done = time.monotonic()
+            self._record(device, mood, requested_at, done, ok)
+
+    def _record(self, device, mood, requested_at, done, ok):
+        ms = (done - requested_at) * 1000
+        with self._cond:
+            if not ok:
+                device.errors += 1
+                return
+            device.applied  += 1
+            device.last_mood = mood
+            device.last_ms   = ms
+            device.avg_ms    = ms if device.avg_ms is None else \
+                               device.avg_ms + EWMA_ALPHA * (ms - device.avg_ms)
+            device.max_ms    = ms if device.max_ms is None else max(device.max_ms, ms)
+            # Spread: how far apart the devices finished for the latest mood
+            spread = self._spread
+            if spread.get('requested_at') == requested_at:
+                if spread['first'] is None:
+                    spread['first'] = done
+                spread['left'] -= 1
+                if spread['left'] == 0:
+                    self.last_spread_ms = (done - spread['first']) * 1000
+
+    def get_stats(self) -> dict:
+        """Per-device apply latency (mood change → device updated) and counters."""
+        def r(ms):
+            return round(ms, 1) if ms is not None else None
+        with self._cond:
+            return {
+                'devices': {
+                    d.name: {
+                        'last_mood': d.last_mood,
+                        'pending':   d.pending is not None,
+                        'applied':   d.applied,
+                        'collapsed': d.collapsed,
+                        'errors':    d.errors,
+                        'last_ms':   r(d.last_ms),
+                        'avg_ms':    r(d.avg_ms),
+                        'max_ms':    r(d.max_ms)
+                    } for d in self._devices.values()
+                },
+                'spread_ms': r(self.last_spread_ms)
+            }
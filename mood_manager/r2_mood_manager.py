@@ -3,16 +3,34 @@
 MoodManager:
   Tracks R2’s current mood, updates hardware visuals, and auto‐resets
   certain short‐lived moods (MAD, SCARED, ALERT) after a configured timeout.
+  Hardware updates are fanned out by a MoodDispatcher outside the mood lock.
 """
 
 import time
 import threading
 
+from r2_timer_service import default_timer_service
+from mood_dispatcher import MoodDispatcher, OUTPUTS_PATH
+
 class MoodManager:
-    def __init__(self):
+    def __init__(self, timer_service=None, hp_driver=None, psi_driver=None,
+                 logic_driver=None, outputs_path=OUTPUTS_PATH):
+        """
+        :param hp_driver:    FilthyHPDriver for the HP LEDs (None = not fitted)
+        :param psi_driver:   PsiDriver
+        :param logic_driver: LogicEngineDriver
+        :param outputs_path: mood → device output table (moods/mood_outputs.json)
+        """
+        self.hp_driver    = hp_driver
+        self.psi_driver   = psi_driver
+        self.logic_driver = logic_driver
         self.current_mood = 'NEUTRAL'
         self._lock = threading.Lock()
         self._timestamp = time.time()
+        self._timers = timer_service or default_timer_service()
+        self._reset_timer = None
+        self._generation  = 0   # bumped on every mood change
+        self._subscribers = []
         # moods that auto‐reset: {mood_name: seconds}
         self.auto_reset_moods = {
             'MAD':     8,
@@ -25,21 +43,38 @@ class MoodManager:
             'MAD', 'SCARED', 'EXCITED', 'SHY',
             'SLEEPY', 'SAD', 'PROUD', 'ALERT'
         ]
+        self.dispatcher = MoodDispatcher({
+            'hp':    self.update_hp_leds,
+            'psi':   self.update_psi,
+            'logic': self.update_logic_display
+        }, outputs_path)
 
-        # Start the background auto‐reset loop
-        thread = threading.Thread(target=self._auto_reset_loop, daemon=True)
-        thread.start()
+    def subscribe(self, callback):
+        """Call callback(mood_name) after every mood change."""
+        with self._lock:
+            self._subscribers.append(callback)
 
-    def _auto_reset_loop(self):
-        while True:
-            time.sleep(1)
-            with self._lock:
-                if self.current_mood in self.auto_reset_moods:
-                    elapsed = time.time() - self._timestamp
-                    if elapsed >= self.auto_reset_moods[self.current_mood]:
-                        # Reset short‐lived moods to CURIOUS
-                        print(f"[MoodManager] Auto‐resetting '{self.current_mood}' → 'CURIOUS'")
-                        self._set_mood_internal('CURIOUS')
+    def _notify(self, mood_name: str):
+        """Run subscriber callbacks; must be called without holding _lock."""
+        for callback in list(self._subscribers):
+            try:
+                callback(mood_name)
+            except Exception as e:
+                print(f"[MoodManager] Subscriber error: {e}")
+
+    def _auto_reset(self, generation: int):
+        """Timer callback: reset a short‐lived mood if it is still current."""
+        with self._lock:
+            # A newer mood change superseded this timer
+            if generation != self._generation:
+                return
+            self._reset_timer = None
+            # Reset short‐lived moods to CURIOUS
+            print(f"[MoodManager] Auto‐resetting '{self.current_mood}' → 'CURIOUS'")
+            self._set_mood_internal('CURIOUS')
+            generation = self._generation
+        self.dispatcher.apply('CURIOUS', generation)
+        self._notify('CURIOUS')
 
     def set_mood(self, mood_name: str):
         """Public API: change R2’s mood immediately."""
@@ -48,32 +83,49 @@ class MoodManager:
                 print(f"[MoodManager] Unknown mood: '{mood_name}'")
                 return
             self._set_mood_internal(mood_name)
+            generation = self._generation
+        # Device I/O happens on the dispatcher's threads, never under _lock
+        self.dispatcher.apply(mood_name, generation)
+        self._notify(mood_name)
 
     def _set_mood_internal(self, mood_name: str):
         """Internal helper to avoid duplicate lock code."""
         print(f"[MoodManager] Mood set to '{mood_name}'")
         self.current_mood = mood_name
         self._timestamp = time.time()
-        # TODO: insert hardware update hooks here:
-        #   self.update_hp_leds(mood_name)
-        #   self.update_psi(mood_name)
-        #   self.update_logic_display(mood_name)
+        self._generation += 1
+
+        # Re-arm the auto‐reset deadline for short‐lived moods
+        if self._reset_timer:
+            self._reset_timer.cancel()
+            self._reset_timer = None
+        secs = self.auto_reset_moods.get(mood_name)
+        if secs:
+            self._reset_timer = self._timers.schedule(secs, self._auto_reset, self._generation)
 
     def get_mood(self) -> str:
         """Return the current mood."""
         with self._lock:
             return self.current_mood
 
-    # Hardware‐stub methods:
+    def get_output_stats(self) -> dict:
+        """Per-device apply latency and counters from the dispatcher."""
+        return self.dispatcher.get_stats()
+
+    # Hardware hooks, called on the dispatcher's per-device threads with the
+    # mood's setting from mood_outputs.json:
 
-    def update_hp_leds(self, mood_name: str):
-        """Hook: update HP LED ring based on mood."""
-        pass
+    def update_hp_leds(self, command: str):
+        """Hook: update HP LED ring (FlthyHP command, e.g. 'A0071')."""
+        if self.hp_driver:
+            self.hp_driver.send_hp_command(command)
 
-    def update_psi(self, mood_name: str):
-        """Hook: update PSI lights based on mood."""
-        pass
+    def update_psi(self, mode: int):
+        """Hook: update PSI lights (PSIPro mode number)."""
+        if self.psi_driver:
+            self.psi_driver.trigger_mode(mode)
 
-    def update_logic_display(self, mood_name: str):
-        """Hook: update logic panel display text/pattern."""
-        pass
+    def update_logic_display(self, pattern: str):
+        """Hook: update logic panel display pattern."""
+        if self.logic_driver:
+            self.logic_driver.set_pattern(pattern)
@@ -3,15 +3,27 @@
 ProfileManager:
   Manages R2’s high‐level operating profiles (LargeCon, PhotoOp, KidEvent, Parade, etc.)
   Handles enabled/disabled features per profile and auto‐revert timers.
+  The active profile is published as an immutable ProfileSnapshot that is
+  swapped atomically, so capability checks never take the lock.
 """
 
 import time
 import threading
+from collections import namedtuple
+
+from r2_timer_service import default_timer_service
+
+# Immutable view of the active profile; `version` increases on every switch
+ProfileSnapshot = namedtuple('ProfileSnapshot', [
+    'name', 'attention_enabled', 'cinematic_enabled',
+    'quick_mood_enabled', 'auto_revert_seconds', 'version'
+])
 
 class ProfileManager:
-    def __init__(self):
+    def __init__(self, timer_service=None):
         self.current_profile       = 'LargeCon'
         self._lock                 = threading.Lock()
+        self._timers               = timer_service or default_timer_service()
         self._auto_revert_timer    = None
         self._auto_revert_target   = 'LargeCon'
 
@@ -55,6 +67,28 @@ class ProfileManager:
             }
         }
 
+        self._snapshot    = self._make_snapshot(self.current_profile, 0)
+        self._subscribers = []
+
+    def _make_snapshot(self, profile_name: str, version: int) -> ProfileSnapshot:
+        caps = self.profiles[profile_name]
+        return ProfileSnapshot(profile_name,
+                               caps['attention_enabled'],
+                               caps['cinematic_enabled'],
+                               caps['quick_mood_enabled'],
+                               caps['auto_revert_seconds'],
+                               version)
+
+    def subscribe(self, callback):
+        """Call callback(snapshot) after every profile change."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
     def set_profile(self, profile_name: str):
         """Switch to a new profile, cancelling any previous auto‐revert."""
         with self._lock:
@@ -64,6 +98,10 @@ class ProfileManager:
 
             print(f"[ProfileManager] Setting profile → {profile_name}")
             self.current_profile = profile_name
+            # Single reference assignment → readers see the old or new snapshot, never a mix
+            snapshot = self._make_snapshot(profile_name, self._snapshot.version + 1)
+            self._snapshot = snapshot
+            subscribers = list(self._subscribers)
 
             # Cancel existing auto‐revert
             if self._auto_revert_timer:
@@ -74,36 +112,45 @@ class ProfileManager:
             secs = self.profiles[profile_name]['auto_revert_seconds']
             if secs:
                 print(f"[ProfileManager] Will auto‐revert to '{self._auto_revert_target}' in {secs}s")
-                timer = threading.Timer(secs, self._auto_revert)
-                timer.daemon = True
-                timer.start()
-                self._auto_revert_timer = timer
+                self._auto_revert_timer = self._timers.schedule(secs, self._auto_revert)
+
+        # Notify outside the lock; subscribers may compare `version` to drop stale updates
+        for callback in subscribers:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"[ProfileManager] Subscriber error: {e}")
 
     def _auto_revert(self):
         """Internal: revert back to the default profile."""
         print(f"[ProfileManager] Auto‐reverting to '{self._auto_revert_target}'")
         self.set_profile(self._auto_revert_target)
 
+    def snapshot(self) -> ProfileSnapshot:
+        """Return the current capability snapshot (lock‐free)."""
+        return self._snapshot
+
     def get_profile(self) -> str:
         """Return the name of the current profile."""
-        with self._lock:
-            return self.current_profile
+        return self._snapshot.name
 
     def is_attention_enabled(self) -> bool:
         """True if camera‐based attention should run under this profile."""
-        return self.profiles[self.get_profile()]['attention_enabled']
+        return self._snapshot.attention_enabled
 
     def is_cinematic_enabled(self) -> bool:
         """True if Cinematic sequences are allowed in this profile."""
-        return self.profiles[self.get_profile()]['cinematic_enabled']
+        return self._snapshot.cinematic_enabled
 
     def is_quick_mood_enabled(self) -> bool:
         """True if quick_mood events should be executed."""
-        return self.profiles[self.get_profile()]['quick_mood_enabled']
+        return self._snapshot.quick_mood_enabled
 
     def get_auto_revert_status(self) -> dict:
         """Return whether an auto‐revert timer is active."""
+        timer = self._auto_revert_timer
         return {
-            'active': bool(self._auto_revert_timer),
-            'target': self._auto_revert_target
+            'active': bool(timer and timer.active),
+            'target': self._auto_revert_target,
+            'remaining_seconds': round(timer.remaining(), 3) if timer and timer.active else None
         }
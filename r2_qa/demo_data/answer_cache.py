@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+AnswerCache:
+  Remembers answered questions by their embedding. A new question whose
+  cosine similarity to a cached one reaches `threshold` gets the cached
+  answer without retrieval or an LLM call. Entries expire after `ttl`
+  seconds; above `max_entries` the least recently used go first. The
+  cache is saved next to the index (metadata JSON + embeddings .npy) after
+  every change and every hit, so the LRU order survives a restart, and
+  reloaded on start.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def normalize_question(text: str) -> str:
+    return ' '.join(text.lower().split()).rstrip('?!. ')
+
+
+class AnswerCache:
+    def __init__(self, path, threshold: float = 0.9, ttl: float = 7 * 24 * 3600,
+                 max_entries: int = 1000):
+        """
+        :param path:        File stem; writes <path>.json and <path>.npy
+        :param threshold:   Minimum cosine similarity for a hit (embeddings are normalised)
+        :param ttl:         Seconds an answer stays valid (None = forever)
+        :param max_entries: Least recently used entries are evicted above this
+        """
+        self.path        = Path(path)
+        self.threshold   = threshold
+        self.ttl         = ttl
+        self.max_entries = max_entries
+        self._lock       = threading.Lock()
+        self._save_lock  = threading.Lock()   # one writer at a time, held across both files
+        self._entries    = []      # {'question', 'answer', 'created', 'last_used', 'hits'}
+        self._embs       = None    # (n, d) float32, row i ↔ _entries[i]
+        self._exact      = {}      # normalised question → row
+        self._emb_version   = 0    # bumped whenever _embs changes
+        self._saved_version = None # _emb_version last written to the .npy
+        self.hits        = 0
+        self.misses      = 0
+        self.lookup_ms   = None    # EWMA
+        self._load()
+
+    # -- persistence -------------------------------------------------------
+
+    @property
+    def _meta_path(self):
+        return self.path.with_suffix('.json')
+
+    @property
+    def _emb_path(self):
+        return self.path.with_suffix('.npy')
+
+    def _load(self):
+        if not (self._meta_path.exists() and self._emb_path.exists()):
+            return
+        try:
+            entries = json.loads(self._meta_path.read_text())
+            embs    = np.load(self._emb_path)
+        except (OSError, ValueError) as e:
+            print(f"[AnswerCache] Ignoring unreadable cache {self.path}: {e}")
+            return
+        if len(entries) != len(embs):
+            print(f"[AnswerCache] Ignoring inconsistent cache {self.path}")
+            return
+        with self._lock:
+            self._entries, self._embs = entries, embs.astype(np.float32)
+            self._saved_version = self._emb_version
+            self._expire_locked(time.time())
+            self._reindex_locked()
+        print(f"[AnswerCache] Loaded {len(self._entries)} answers from {self.path}")
+
+    @staticmethod
+    def _write_atomic(target: Path, write):
+        """write(f) to a uniquely named temp file next to `target`, then replace it."""
+        with tempfile.NamedTemporaryFile(dir=target.parent, prefix=target.name + '.',
+                                         suffix='.tmp', delete=False) as f:
+            try:
+                write(f)
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, target)
+
+    def save(self):
+        """Write the cache to disk (atomically); the .npy only when the embeddings changed."""
+        with self._save_lock:
+            # Both files from one snapshot, and no other save in between
+            with self._lock:
+                if not self._entries:
+                    return
+                entries = [dict(e) for e in self._entries]
+                version = self._emb_version
+                embs    = self._embs.copy() if version != self._saved_version else None
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if embs is not None:
+                self._write_atomic(self._emb_path, lambda f: np.save(f, embs))
+            self._write_atomic(self._meta_path,
+                               lambda f: f.write(json.dumps(entries, indent=1).encode('utf-8')))
+            self._saved_version = version
+
+    # -- housekeeping (callers hold _lock) ------------------------------------
+
+    def _reindex_locked(self):
+        self._exact = {normalize_question(e['question']): i for i, e in enumerate(self._entries)}
+
+    def _keep_locked(self, keep):
+        self._entries = [self._entries[i] for i in keep]
+        self._embs    = self._embs[keep] if keep else None
+        self._emb_version += 1
+        self._reindex_locked()
+
+    def _expire_locked(self, now):
+        if self.ttl is None or not self._entries:
+            return
+        keep = [i for i, e in enumerate(self._entries) if now - e['created'] < self.ttl]
+        if len(keep) != len(self._entries):
+            self._keep_locked(keep)
+
+    # -- API -----------------------------------------------------------------
+
+    def lookup(self, question: str, embedding=None):
+        """
+        Return the cached answer for `question`, or None. A hit is saved
+        (metadata only) so its recency survives a restart.
+        :param embedding: Normalised (d,) embedding of the question; without
+                          it only an exact (normalised) text match can hit
+        """
+        t0  = time.monotonic()
+        now = time.time()
+        with self._lock:
+            self._expire_locked(now)
+            row = self._exact.get(normalize_question(question))
+            if row is None and embedding is not None and self._embs is not None:
+                sims = self._embs @ np.asarray(embedding, dtype=np.float32).ravel()
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    row = best
+            if row is None:
+                self.misses += 1
+                answer = None
+            else:
+                entry = self._entries[row]
+                entry['last_used'] = now
+                entry['hits'] += 1
+                self.hits += 1
+                answer = entry['answer']
+            ms = (time.monotonic() - t0) * 1000
+            self.lookup_ms = ms if self.lookup_ms is None else self.lookup_ms + 0.2 * (ms - self.lookup_ms)
+        if answer is not None:
+            self.save()
+        return answer
+
+    def put(self, question: str, embedding, answer: str):
+        """Cache an answer (replacing one for the same question) and save."""
+        now = time.time()
+        emb = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        with self._lock:
+            row = self._exact.get(normalize_question(question))
+            entry = {'question': question, 'answer': answer,
+                     'created': now, 'last_used': now, 'hits': 0}
+            if row is not None:
+                self._entries[row] = entry
+                self._embs[row]    = emb[0]
+            else:
+                self._entries.append(entry)
+                self._embs = emb if self._embs is None else np.vstack([self._embs, emb])
+            self._emb_version += 1
+            self._expire_locked(now)
+            if len(self._entries) > self.max_entries:
+                by_use = sorted(range(len(self._entries)),
+                                key=lambda i: self._entries[i]['last_used'])
+                self._keep_locked(sorted(by_use[len(self._entries) - self.max_entries:]))
+            else:
+                self._reindex_locked()
+        self.save()
+
+    def clear(self):
+        with self._save_lock:
+            with self._lock:
+                self._keep_locked([])
+            for p in (self._meta_path, self._emb_path):
+                if p.exists():
+                    p.unlink()
+            self._saved_version = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries':   len(self._entries),
+                'hits':      self.hits,
+                'misses':    self.misses,
+                'hit_rate':  round(self.hits / total, 3) if total else None,
+                'lookup_ms': round(self.lookup_ms, 2) if self.lookup_ms is not None else None,
+                'threshold': self.threshold
+            }
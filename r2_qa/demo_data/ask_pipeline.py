@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Ask-to-speech pipeline:
+  Streams QAModule's answer into TTSDriver a sentence at a time. Each
+  sentence is queued for rendering as soon as its last token arrives, so
+  R2 starts talking after the first sentence while the rest is still
+  being generated and synthesised.
+"""
+
+import re
+import threading
+import time
+
+# Sentence end: . ! ? (plus closing quotes/brackets) followed by whitespace
+_SENTENCE_END = re.compile(r'[.!?]+["\'”’)\]]*\s+')
+# Words whose trailing '.' doesn't end a sentence
+_ABBREVIATIONS = {'mr', 'mrs', 'ms', 'dr', 'st', 'vs', 'jr', 'sr', 'lt', 'gen', 'capt', 'e.g', 'i.e', 'a.k.a'}
+
+
+class SentenceSplitter:
+    """Cuts a stream of text fragments into sentences as soon as they are complete."""
+
+    def __init__(self, max_chars: int = 200):
+        """
+        :param max_chars: A run-on sentence is cut at a clause break (, ; :) past this length
+        """
+        self.max_chars = max_chars
+        self._buf = ''
+
+    def feed(self, fragment: str) -> list:
+        """Add a fragment; return the sentences it completed."""
+        self._buf += fragment
+        sentences = []
+        start = 0
+        for m in _SENTENCE_END.finditer(self._buf):
+            candidate = self._buf[start:m.end()].strip()
+            last_word = candidate.rstrip('.!?"\'”’)]').rsplit(None, 1)[-1].lower() if candidate else ''
+            if candidate.endswith('.') and last_word in _ABBREVIATIONS:
+                continue
+            sentences.append(candidate)
+            start = m.end()
+        self._buf = self._buf[start:]
+        if len(self._buf) > self.max_chars:
+            cut = max(self._buf.rfind(c, 0, len(self._buf) - 1) for c in ',;:')
+            if cut > 0:
+                sentences.append(self._buf[:cut + 1].strip())
+                self._buf = self._buf[cut + 1:]
+        return [s for s in sentences if s]
+
+    def flush(self) -> list:
+        """Return whatever is left once the stream has ended."""
+        rest, self._buf = self._buf.strip(), ''
+        return [rest] if rest else []
+
+
+def ask_and_speak(qa, tts, question: str) -> dict:
+    """
+    Answer `question` and speak it while it streams in. Returns once the
+    text is complete (speech may still be playing) with the answer and
+    stage timings in ms since the call: first_token, first_sentence,
+    first_audio (None if playback hadn't started yet) and total.
+    """
+    t0 = time.monotonic()
+    def ms():
+        return round((time.monotonic() - t0) * 1000, 1)
+
+    timings = {'first_token': None, 'first_sentence': None, 'first_audio': None}
+    lock = threading.Lock()
+    def on_first_audio():
+        with lock:
+            if timings['first_audio'] is None:
+                timings['first_audio'] = ms()
+
+    utterance = tts.start_utterance()
+    splitter  = SentenceSplitter()
+    parts     = []
+    sentences = 0
+
+    def queue(batch):
+        nonlocal sentences
+        for sentence in batch:
+            if timings['first_sentence'] is None:
+                timings['first_sentence'] = ms()
+            tts.queue_sentence(sentence, utterance,
+                               on_play=on_first_audio if sentences == 0 else None)
+            sentences += 1
+
+    for fragment in qa.stream_answer(question):
+        if timings['first_token'] is None:
+            timings['first_token'] = ms()
+        parts.append(fragment)
+        queue(splitter.feed(fragment))
+    queue(splitter.flush())
+
+    timings['total'] = ms()
+    with lock:
+        return {'answer': ''.join(parts).strip(), 'sentences': sentences,
+                'timings_ms': dict(timings)}
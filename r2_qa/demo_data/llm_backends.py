@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+LLM backends:
+  Each backend streams an answer as text fragments while it is generated.
+  OpenAIBackend talks to the OpenAI API; LocalBackend is an offline
+  stand-in that answers from the retrieved passages at a steady token
+  rate, for events without a network and for testing the speech pipeline.
+"""
+
+import time
+
+
+class OpenAIBackend:
+    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo", max_tokens: int = 150):
+        from openai import OpenAI   # optional dependency
+        self.client     = OpenAI(api_key=api_key)
+        self.model      = model
+        self.max_tokens = max_tokens
+
+    def stream(self, prompt: str, contexts: list):
+        resp = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=self.max_tokens,
+            stream=True
+        )
+        for chunk in resp:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class LocalBackend:
+    FALLBACK = "I don't know the answer to that one."
+
+    def __init__(self, token_delay: float = 0.03, max_passages: int = 2):
+        """
+        :param token_delay:  Seconds per word, to behave like a real model
+        :param max_passages: Retrieved passages read out as the answer
+        """
+        self.token_delay  = token_delay
+        self.max_passages = max_passages
+
+    def stream(self, prompt: str, contexts: list):
+        text = ' '.join(c['text'] for c in contexts[:self.max_passages]) or self.FALLBACK
+        for i, word in enumerate(text.split()):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield word if i == 0 else ' ' + word
+
+
+BACKENDS = {
+    'openai': OpenAIBackend,
+    'local':  LocalBackend
+}
+
+def make_llm(backend: str, api_key: str = None):
+    """
+    Build an LLM backend by name. 'openai' without an API key gives None
+    (QAModule then answers "No LLM configured").
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{backend}'")
+    if backend == 'openai':
+        return OpenAIBackend(api_key) if api_key else None
+    return BACKENDS[backend]()
@@ -3,32 +3,78 @@
 QAModule:
   Retrieves relevant wiki passages via KnowledgeBase,
   then calls an LLM (OpenAI or local) to generate an answer.
+  stream_answer() yields the answer as it is generated. Questions close
+  enough to one answered before are served from an AnswerCache.
 """
 
-import os
-from openai import OpenAI
+from pathlib import Path
+
+from answer_cache import AnswerCache
 from knowledge_base import KnowledgeBase
+from llm_backends import make_llm
+
+CACHE_DIR = Path(__file__).parent
 
 class QAModule:
-    def __init__(self, api_key: str = None):
-        self.kb = KnowledgeBase()
-        self.client = OpenAI(api_key=api_key) if api_key else None
+    def __init__(self, api_key: str = None, backend: str = None,
+                 cache_threshold: float = 0.9, cache_ttl: float = 7 * 24 * 3600,
+                 cache_size: int = 1000, kb_options: dict = None):
+        """
+        :param backend:         'openai' or 'local'; default openai when an API key
+                                is given, else the offline local stand-in
+        :param cache_threshold: Similarity for reusing a cached answer (None = no cache)
+        :param cache_ttl:       Seconds a cached answer stays valid
+        :param cache_size:      Cached answers kept (least recently used evicted)
+        :param kb_options:      KnowledgeBase settings (index_type, pq, nlist, …)
+        """
+        self.kb = KnowledgeBase(**(kb_options or {}))
+        backend = backend or ('openai' if api_key else 'local')
+        self.llm = make_llm(backend, api_key)
+        # One cache per backend: the stand-in's answers mustn't be served for the real model's
+        self.cache = AnswerCache(CACHE_DIR / f"answer_cache_{backend}", cache_threshold,
+                                 cache_ttl, cache_size) if cache_threshold is not None else None
+        if self.cache is not None and self.kb.changed:
+            # Cached answers were generated from the old passages
+            self.cache.clear()
 
-    def answer(self, question: str) -> str:
-        # 1) Retrieve contexts
-        contexts = self.kb.retrieve(question, top_k=3)
+    def _prompt(self, question: str, contexts) -> str:
         prompt = "Use these Star Wars facts to answer:\n"
         for ctx in contexts:
             prompt += f"- {ctx['text']}\n"
         prompt += f"\nQ: {question}\nA:"
+        return prompt
+
+    def stream_answer(self, question: str):
+        """Yield the answer in fragments as the LLM produces them."""
+        if self.llm is None:
+            yield "Error: No LLM configured."
+            return
+        q_emb = self.kb.encode([question])
+
+        # 0) A similar question answered before?
+        if self.cache is not None:
+            cached = self.cache.lookup(question, q_emb[0])
+            if cached is not None:
+                yield cached
+                return
+
+        # 1) Retrieve contexts
+        contexts = self.kb.retrieve(question, top_k=3, q_emb=q_emb)
 
         # 2) Generate with LLM
-        if self.client:
-            resp = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role":"user","content":prompt}],
-                max_tokens=150
-            )
-            return resp.choices[0].message.content.strip()
-        else:
-            return "Error: No LLM configured."
+        parts = []
+        for fragment in self.llm.stream(self._prompt(question, contexts), contexts):
+            parts.append(fragment)
+            yield fragment
+        # Only reached when the whole answer was generated
+        answer = ''.join(parts).strip()
+        if self.cache is not None and answer:
+            self.cache.put(question, q_emb[0], answer)
+
+    def answer(self, question: str) -> str:
+        return ''.join(self.stream_answer(question)).strip()
+
+    def get_stats(self) -> dict:
+        """Answer cache hit rate and lookup time, knowledge base size."""
+        return {'answer_cache': self.cache.stats() if self.cache is not None else None,
+                'knowledge_base': self.kb.stats()}
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+TTS backends:
+  Each backend renders text to an audio file. `cache_id` names the engine
+  and every setting that changes the sound, so the TTS cache can tell
+  renders apart. espeak and piper run offline; gTTS needs the network.
+"""
+
+import shutil
+import subprocess
+
+
+class EspeakBackend:
+    """espeak-ng (or espeak): tiny, fast, robotic — fine for a droid."""
+    extension = 'wav'
+
+    def __init__(self, voice: str = 'en-us', speed: int = 165, pitch: int = 50,
+                 binary: str = None):
+        """
+        :param voice: espeak voice name (`espeak-ng --voices`)
+        :param speed: Words per minute
+        :param pitch: 0–99
+        """
+        self.voice  = voice
+        self.speed  = speed
+        self.pitch  = pitch
+        self.binary = binary or shutil.which('espeak-ng') or shutil.which('espeak') or 'espeak-ng'
+
+    @property
+    def cache_id(self) -> str:
+        return f"espeak:{self.voice}:{self.speed}:{self.pitch}"
+
+    def render(self, text: str, path: str):
+        # Text goes in on stdin so a leading '-' is never taken for an option
+        subprocess.run([self.binary, '-v', self.voice, '-s', str(self.speed),
+                        '-p', str(self.pitch), '-w', path, '--stdin'],
+                       input=text.encode('utf-8'), check=True,
+                       capture_output=True, timeout=60)
+
+
+class PiperBackend:
+    """piper neural TTS with a local .onnx voice model."""
+    extension = 'wav'
+
+    def __init__(self, voice: str, speaker: int = None, binary: str = None):
+        """
+        :param voice:   Path to the piper voice model (.onnx, with its .onnx.json)
+        :param speaker: Speaker id for multi-speaker models
+        """
+        self.voice   = voice
+        self.speaker = speaker
+        self.binary  = binary or shutil.which('piper') or 'piper'
+
+    @property
+    def cache_id(self) -> str:
+        return f"piper:{self.voice}:{self.speaker}"
+
+    def render(self, text: str, path: str):
+        cmd = [self.binary, '--model', self.voice, '--output_file', path]
+        if self.speaker is not None:
+            cmd += ['--speaker', str(self.speaker)]
+        subprocess.run(cmd, input=text.encode('utf-8'), check=True,
+                       capture_output=True, timeout=120)
+
+
+class GTTSBackend:
+    """Google TTS over the network; only for when there is a connection."""
+    extension = 'mp3'
+
+    def __init__(self, voice: str = 'en'):
+        """
+        :param voice: gTTS language code
+        """
+        from gtts import gTTS   # optional dependency
+        self._gtts = gTTS
+        self.voice = voice
+
+    @property
+    def cache_id(self) -> str:
+        return f"gtts:{self.voice}"
+
+    def render(self, text: str, path: str):
+        self._gtts(text=text, lang=self.voice).save(path)
+
+
+BACKENDS = {
+    'espeak': EspeakBackend,
+    'piper':  PiperBackend,
+    'gtts':   GTTSBackend
+}
+
+
+def get_backend(name: str = 'espeak', voice: str = None, **kwargs):
+    """Build a backend by name; `voice` is passed on only when given."""
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend '{name}' (choose from {', '.join(BACKENDS)})")
+    if voice is not None:
+        kwargs['voice'] = voice
+    return cls(**kwargs)
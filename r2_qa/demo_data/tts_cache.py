@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+TTSCache:
+  Content-addressed store of rendered speech. A file is named by the hash
+  of the backend's cache_id and the (whitespace-normalised) text, so the
+  same phrase in the same voice is only ever synthesised once. When the
+  cache grows past max_bytes, least recently played files are deleted;
+  recency survives restarts through the files' mtimes.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+_KEY_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def normalize_text(text: str) -> str:
+    return ' '.join(text.split())
+
+
+class TTSCache:
+    def __init__(self, cache_dir: str, max_bytes: int = 200 * 1024 * 1024):
+        """
+        :param cache_dir: Directory holding the rendered files
+        :param max_bytes: Evict least recently used files above this total size
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock     = threading.Lock()
+        self._entries  = OrderedDict()   # key → (path, size), oldest first
+        self._bytes    = 0
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+        self._scan()
+
+    def _scan(self):
+        """Index files already on disk, oldest use first."""
+        found = []
+        for path in self.cache_dir.iterdir():
+            if path.is_file() and _KEY_RE.match(path.stem):
+                st = path.stat()
+                found.append((st.st_mtime, path.stem, path, st.st_size))
+        for _, key, path, size in sorted(found):
+            self._entries[key] = (path, size)
+            self._bytes += size
+
+    @staticmethod
+    def key(cache_id: str, text: str) -> str:
+        return hashlib.sha256(f"{cache_id}\n{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str, count: bool = True):
+        """
+        Path of a cached render (marked as just used), or None.
+        :param count: Count towards hit/miss stats (False for a re-check)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry[0].exists():
+                if entry is not None:
+                    # Deleted behind our back
+                    self._entries.pop(key)
+                    self._bytes -= entry[1]
+                self.misses += count
+                return None
+            self._entries.move_to_end(key)
+            self.hits += count
+        try:
+            os.utime(entry[0])   # keep LRU order across restarts
+        except OSError:
+            pass
+        return entry[0]
+
+    def path_for(self, key: str, extension: str) -> Path:
+        return self.cache_dir / f"{key}.{extension}"
+
+    def add(self, key: str, path: Path):
+        """Register a file just rendered at path_for(key, …); evicts if over size."""
+        size = path.stat().st_size
+        evict = []
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (path, size)
+            self._bytes += size
+            # Never evict the file we were just asked for
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (old_path, old_size) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                self.evictions += 1
+                evict.append(old_path)
+        for old_path in evict:
+            try:
+                old_path.unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries':   len(self._entries),
+                'bytes':     self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits':      self.hits,
+                'misses':    self.misses,
+                'hit_rate':  round(self.hits / total, 3) if total else None,
+                'evictions': self.evictions
+            }
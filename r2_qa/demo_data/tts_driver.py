@@ -1,23 +1,221 @@
 #!/usr/bin/env python3
 """
 TTSDriver:
-  Uses gTTS to generate an MP3 from a text string
-  and then plays it via your SoundDriver.
+  Renders text to speech with a local (offline) backend, keeps every
+  render in a content-addressed LRU cache, and plays it on the
+  controller's audio output. A phrase that was said before — or
+  pre-rendered with `python3 tts_driver.py --prerender tts_phrases.json` —
+  starts playing without any synthesis. Streamed answers are queued a
+  sentence at a time (queue_sentence) and play back to back.
 """
 
-import os, uuid
-from gtts import gTTS
-from sound_driver import SoundDriver  # assume exists in PYTHONPATH
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from tts_backends import get_backend
+from tts_cache import TTSCache
+
+PHRASES_PATH = Path(__file__).parent / "tts_phrases.json"
+
+# Audio players by file type (the DFPlayer can only play tracks on its SD card)
+PLAYERS = {
+    'wav': ['aplay', '-q'],
+    'mp3': ['mpg123', '-q']
+}
+
+# Weight of the newest sample in the moving average
+EWMA_ALPHA = 0.2
+
 
 class TTSDriver:
-    def __init__(self, out_dir: str = "tts_outputs"):
-        os.makedirs(out_dir, exist_ok=True)
-        self.out_dir = out_dir
-        self.sound_driver = SoundDriver()
+    def __init__(self, out_dir: str = "tts_outputs", backend: str = "espeak",
+                 voice: str = None, max_cache_mb: int = 200, player: list = None):
+        """
+        :param out_dir:      Cache directory for rendered speech
+        :param backend:      'espeak' or 'piper' (offline) or 'gtts' (online)
+        :param voice:        Backend voice (espeak voice name, piper model path, gTTS language)
+        :param max_cache_mb: Cache size before least recently used renders are deleted
+        :param player:       Player command (file path appended); default by file type
+        """
+        self.backend = get_backend(backend, voice)
+        self.cache   = TTSCache(out_dir, max_cache_mb * 1024 * 1024)
+        self.player  = player or PLAYERS.get(self.backend.extension, ['aplay', '-q'])
+        if not shutil.which(self.player[0]):
+            print(f"[TTSDriver] Player '{self.player[0]}' not found; speech will only be rendered")
+        self._render_lock = threading.Lock()
+        self.renders      = 0
+        self.render_ms    = None   # EWMA synthesis time
+
+        # Sentences are rendered and played on two threads, so sentence n+1
+        # is synthesised while sentence n is playing
+        self._cond         = threading.Condition()
+        self._utterance    = 0        # bumped by start_utterance(); stale items are dropped
+        self._render_queue = deque()  # (utterance, text, on_play)
+        self._play_queue   = deque()  # (utterance, path, on_play)
+        self._playing      = None     # Popen of the current playback
+        threading.Thread(target=self._render_loop, daemon=True, name='tts-render').start()
+        threading.Thread(target=self._play_loop, daemon=True, name='tts-play').start()
+        print(f"[TTSDriver] Backend {self.backend.cache_id}, cache {self.cache.cache_dir}")
+
+    def render(self, text: str) -> Path:
+        """Return the audio file for `text`, synthesising it only on a cache miss."""
+        key  = self.cache.key(self.backend.cache_id, text)
+        path = self.cache.get(key)
+        if path is not None:
+            return path
+        with self._render_lock:
+            # Another thread may have rendered it while we waited
+            path = self.cache.get(key, count=False)
+            if path is not None:
+                return path
+            path = self.cache.path_for(key, self.backend.extension)
+            tmp  = path.with_name(f".{path.name}.tmp")
+            t0   = time.monotonic()
+            try:
+                self.backend.render(text, str(tmp))
+                os.replace(tmp, path)   # never cache a half-written file
+            finally:
+                if tmp.exists():
+                    tmp.unlink()
+            ms = (time.monotonic() - t0) * 1000
+            self.renders  += 1
+            self.render_ms = ms if self.render_ms is None else \
+                             self.render_ms + EWMA_ALPHA * (ms - self.render_ms)
+            self.cache.add(key, path)
+            return path
+
+    def start_utterance(self) -> int:
+        """Cut off current speech and drop anything queued; returns the new utterance id."""
+        with self._cond:
+            self._utterance += 1
+            self._render_queue.clear()
+            self._play_queue.clear()
+            if self._playing is not None and self._playing.poll() is None:
+                self._playing.terminate()
+            self._playing = None
+            return self._utterance
+
+    def stop(self):
+        self.start_utterance()
+
+    def queue_sentence(self, text: str, utterance: int, on_play=None):
+        """
+        Render `text` in the background and play it after the sentences
+        queued before it. Dropped if a newer utterance has started.
+        :param on_play: Optional callback() when its playback starts
+        """
+        if not text.strip():
+            return
+        with self._cond:
+            if utterance != self._utterance:
+                return
+            self._render_queue.append((utterance, text, on_play))
+            self._cond.notify_all()
 
     def speak(self, text: str):
-        """Generate TTS MP3 and play it on your sound hardware."""
-        filename = os.path.join(self.out_dir, f"{uuid.uuid4()}.mp3")
-        gTTS(text=text, lang="en").save(filename)
-        # send file to DFPlayer via SoundDriver
-        self.sound_driver.play_mp3(filename)
+        """Render (or fetch from cache) and play `text`, cutting off earlier speech."""
+        self.queue_sentence(text, self.start_utterance())
+
+    def _render_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._render_queue)
+                utterance, text, on_play = self._render_queue.popleft()
+                if utterance != self._utterance:
+                    continue
+            try:
+                path = self.render(text)
+            except Exception as e:
+                print(f"[TTSDriver] Render failed for {text!r}: {e}")
+                continue
+            with self._cond:
+                if utterance == self._utterance:
+                    self._play_queue.append((utterance, path, on_play))
+                    self._cond.notify_all()
+
+    def _play_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._play_queue)
+                utterance, path, on_play = self._play_queue.popleft()
+                if utterance != self._utterance:
+                    continue
+                try:
+                    # Started under the lock so start_utterance() can always cut it off
+                    proc = self._playing = subprocess.Popen(self.player + [str(path)],
+                                                            stdout=subprocess.DEVNULL,
+                                                            stderr=subprocess.DEVNULL)
+                except OSError as e:
+                    print(f"[TTSDriver] Can't play {path}: {e}")
+                    continue
+            if on_play:
+                on_play()
+            proc.wait()
+            with self._cond:
+                if self._playing is proc:
+                    self._playing = None
+
+    def prerender(self, phrases) -> int:
+        """Render every phrase not yet cached; returns how many were synthesised."""
+        before = self.renders
+        for text in phrases:
+            try:
+                self.render(text)
+            except Exception as e:
+                print(f"[TTSDriver] Pre-render failed for {text!r}: {e}")
+        return self.renders - before
+
+    def get_stats(self) -> dict:
+        stats = self.cache.stats()
+        stats.update(backend=self.backend.cache_id, renders=self.renders,
+                     render_ms=round(self.render_ms, 1) if self.render_ms is not None else None)
+        return stats
+
+
+def load_phrases(path) -> list:
+    """
+    Phrases to pre-render: a .txt file (one per line) or a JSON list of
+    strings, {"text": …} or {"question": …} entries. Questions are answered
+    through QAModule so their answers are cached too.
+    """
+    path = Path(path)
+    if path.suffix != '.json':
+        return [line.strip() for line in path.read_text().splitlines() if line.strip()]
+    phrases, questions = [], []
+    for entry in json.loads(path.read_text()):
+        if isinstance(entry, str):
+            phrases.append(entry)
+        elif 'question' in entry:
+            questions.append(entry['question'])
+        else:
+            phrases.append(entry['text'])
+    if questions:
+        from qa_module import QAModule
+        qa = QAModule(api_key=os.getenv("OPENAI_API_KEY", None))
+        phrases += [qa.answer(q) for q in questions]
+    return phrases
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pre-render phrases into the TTS cache")
+    parser.add_argument('--prerender', nargs='+', default=[str(PHRASES_PATH)],
+                        metavar='FILE', help="phrase files (.txt or .json)")
+    parser.add_argument('--backend', default=os.getenv("R2_TTS_BACKEND", "espeak"))
+    parser.add_argument('--voice', default=os.getenv("R2_TTS_VOICE"))
+    parser.add_argument('--out-dir', default=os.getenv("R2_TTS_CACHE_DIR", "tts_outputs"))
+    args = parser.parse_args()
+
+    tts = TTSDriver(out_dir=args.out_dir, backend=args.backend, voice=args.voice,
+                    max_cache_mb=int(os.getenv("R2_TTS_CACHE_MB", "200")))
+    phrases = [p for f in args.prerender for p in load_phrases(f)]
+    rendered = tts.prerender(phrases)
+    print(f"[TTSDriver] {len(phrases)} phrases, {rendered} newly rendered, "
+          f"{len(phrases) - rendered} already cached")
+    print(json.dumps(tts.get_stats(), indent=2))
@@ -3,38 +3,458 @@
 KnowledgeBase:
   Ingests text passages, builds/loads a FAISS index of embeddings,
   and retrieves the top-k relevant passages for a query.
+
+  Passages (with their embeddings) live in a SQLite store, so neither the
+  corpus nor the vectors have to fit in RAM. A manifest records the
+  embedding model, index settings and a signature of every source file;
+  sync() re-encodes only passages that were added or changed since, and
+  drops removed ones. Sources are JSON lists or JSON Lines files of
+  {"id": …, "text": …} objects.
+
+  Run `python3 knowledge_base.py` to ingest ahead of time.
 """
 
+import argparse
+import hashlib
 import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
 from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
-from pathlib import Path
 
 # Paths
 DATA_DIR       = Path(__file__).parent / "demo_data"
 INDEX_PATH     = DATA_DIR / "sw_index.faiss"
+STORE_PATH     = DATA_DIR / "sw_passages.sqlite"
+MANIFEST_PATH  = DATA_DIR / "sw_manifest.json"
 PASSAGES_PATH  = DATA_DIR / "sample_passages.json"
+CORPUS_DIR     = DATA_DIR / "corpus"   # extra *.json / *.jsonl sources, e.g. a wiki dump
 EMBED_MODEL    = "all-MiniLM-L6-v2"
 
+# Index types
+FLAT = 'flat'   # exact search; fine up to ~100k passages
+IVF  = 'ivf'    # inverted lists, searches `nprobe` of `nlist` clusters
+HNSW = 'hnsw'   # graph; fastest queries, removals only drop out at compaction
+
+# Dead vectors (removed/changed passages still in the index) that trigger a compaction
+COMPACT_RATIO = 0.25
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def iter_passages(path: Path):
+    """Yield passage dicts from a .jsonl file (streamed) or a .json list."""
+    if path.suffix == '.jsonl':
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from json.loads(path.read_text(encoding='utf-8'))
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
 class KnowledgeBase:
-    def __init__(self):
-        self.model    = SentenceTransformer(EMBED_MODEL)
-        self.passages = json.loads(PASSAGES_PATH.read_text())
-        if INDEX_PATH.exists():
-            self.index = faiss.read_index(str(INDEX_PATH))
+    def __init__(self, index_type: str = FLAT, nlist: int = 1024, pq: int = 0,
+                 hnsw_m: int = 32, nprobe: int = 16, ef_search: int = 64,
+                 sources=None, batch_size: int = 64, chunk_size: int = 2048,
+                 train_size: int = 50000, sync: bool = True):
+        """
+        :param index_type: 'flat', 'ivf' or 'hnsw'
+        :param nlist:      IVF clusters (reduced automatically for small corpora)
+        :param pq:         Product-quantise vectors into this many bytes (0 = store full vectors)
+        :param hnsw_m:     HNSW graph degree
+        :param nprobe:     IVF clusters searched per query
+        :param ef_search:  HNSW search breadth
+        :param sources:    Passage files; default sample_passages.json plus corpus/*.json(l)
+        :param batch_size: Passages per model.encode batch
+        :param chunk_size: Passages read, encoded and stored per step of an ingestion
+        :param train_size: Vectors used to train IVF/PQ (held in RAM once)
+        :param sync:       Bring the index up to date with the sources now
+        """
+        if index_type not in (FLAT, IVF, HNSW):
+            raise ValueError(f"Unknown index type '{index_type}'")
+        self.config = {'model': EMBED_MODEL, 'index_type': index_type, 'nlist': nlist,
+                       'pq': pq, 'hnsw_m': hnsw_m}
+        self.nprobe     = nprobe
+        self.ef_search  = ef_search
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.train_size = train_size
+        if sources is None:
+            sources = [PASSAGES_PATH]
+            if CORPUS_DIR.is_dir():
+                sources += sorted(p for p in CORPUS_DIR.iterdir() if p.suffix in ('.json', '.jsonl'))
+        self.sources = [Path(s).resolve() for s in sources]
+
+        self.model = SentenceTransformer(EMBED_MODEL)
+        self.dim   = self.model.get_sentence_embedding_dimension()
+        self._lock = threading.RLock()
+        self._db   = sqlite3.connect(str(STORE_PATH), check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS passages (
+                                vec_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                pid    TEXT UNIQUE NOT NULL,
+                                source TEXT NOT NULL,
+                                hash   TEXT NOT NULL,
+                                data   TEXT NOT NULL,
+                                emb    BLOB NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS passages_source ON passages(source)")
+        self._db.commit()
+        self._pending = []   # (vec_ids, embs) waiting for an untrained index
+        self._dead    = set()   # vec_ids removed from the store but still in the index (HNSW)
+        self._params  = None    # search parameters excluding _dead, built on demand
+        self.changed  = False
+        self._load()
+        if sync:
+            self.sync()
+
+    # -- index lifecycle -----------------------------------------------------
+
+    def _load(self):
+        """Open the saved index if it matches the manifest, else rebuild it from the store."""
+        self.manifest = json.loads(MANIFEST_PATH.read_text()) if MANIFEST_PATH.exists() else {}
+        same_model = self.manifest.get('config', {}).get('model') == EMBED_MODEL
+        if not same_model and self._count():
+            print(f"[KnowledgeBase] Embedding model changed → re-encoding every passage")
+            self._clear_store()
+        if self.manifest.get('config') == self.config:
+            if INDEX_PATH.exists():
+                self.index = faiss.read_index(str(INDEX_PATH))
+                if self.index.ntotal == self.manifest.get('ntotal'):
+                    self._set_search_params()
+                    self._live = self._count()
+                    self._find_dead()
+                    return
+                print(f"[KnowledgeBase] {INDEX_PATH.name} doesn't match the manifest → rebuilding")
+            elif not self._count():
+                # Empty: the index is created (and trained) by the first ingestion
+                self.index, self._live = None, 0
+                return
+        elif self._count():
+            print(f"[KnowledgeBase] Index settings changed → rebuilding from stored embeddings")
+        self._rebuild_from_store()
+        self._save()
+
+    def _new_index(self, n_train: int):
+        """Create the configured index, scaled down when there is little to train on."""
+        cfg, d = self.config, self.dim
+        pq = cfg['pq']
+        if pq and (d % pq or n_train < 256):
+            print(f"[KnowledgeBase] PQ{pq} needs ≥256 training vectors and a divisor of {d} → full vectors")
+            pq = 0
+        if cfg['index_type'] == IVF:
+            nlist = max(1, min(cfg['nlist'], n_train // 39))
+            spec  = f"IVF{nlist},PQ{pq}" if pq else f"IVF{nlist},Flat"
+        elif cfg['index_type'] == HNSW:
+            spec = f"IDMap2,HNSW{cfg['hnsw_m']}_PQ{pq}" if pq else f"IDMap2,HNSW{cfg['hnsw_m']}"
         else:
-            self._build_index()
-
-    def _build_index(self):
-        texts = [p["text"] for p in self.passages]
-        embs  = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
-        d     = embs.shape[1]
-        self.index = faiss.IndexFlatIP(d)
-        self.index.add(embs)
-        faiss.write_index(self.index, str(INDEX_PATH))
-
-    def retrieve(self, query: str, top_k: int = 3):
-        q_emb = self.model.encode([query], convert_to_numpy=True, normalize_embeddings=True)
-        D, I  = self.index.search(q_emb, top_k)
-        return [self.passages[i] for i in I[0]]
+            spec = f"IDMap2,PQ{pq}" if pq else "IDMap2,Flat"
+        if cfg['index_type'] == IVF or cfg['pq']:
+            # Retrained by _compact_if_needed() once the corpus has grown
+            self.manifest['trained_on'] = n_train
+        print(f"[KnowledgeBase] New index '{spec}'")
+        return faiss.index_factory(d, spec, faiss.METRIC_INNER_PRODUCT)
+
+    def _set_search_params(self):
+        params = faiss.ParameterSpace()
+        if self.config['index_type'] == IVF:
+            params.set_index_parameter(self.index, 'nprobe', self.nprobe)
+        elif self.config['index_type'] == HNSW:
+            params.set_index_parameter(self.index, 'efSearch', self.ef_search)
+
+    def _find_dead(self):
+        """Recover the dead vectors of a saved HNSW index (in the index, not in the store)."""
+        self._set_dead(set())
+        if self.config['index_type'] != HNSW or self.index.ntotal == self._live:
+            return
+        stored = {r[0] for r in self._db.execute("SELECT vec_id FROM passages")}
+        self._set_dead({int(i) for i in faiss.vector_to_array(self.index.id_map)} - stored)
+
+    def _set_dead(self, dead):
+        self._dead, self._params = dead, None
+
+    def _search_params(self):
+        """HNSW search parameters that skip the dead vectors; None when there are none."""
+        if not self._dead:
+            return None
+        if self._params is None:
+            ids = np.fromiter(self._dead, dtype=np.int64, count=len(self._dead))
+            batch = faiss.IDSelectorBatch(ids)
+            sel   = faiss.IDSelectorNot(batch)
+            # Keep the selectors alive as long as the parameters refer to them
+            self._params = (faiss.SearchParametersHNSW(sel=sel, efSearch=self.ef_search), sel, batch)
+        return self._params[0]
+
+    def _rebuild_from_store(self):
+        """New index from the stored embeddings (no re-encoding)."""
+        self.index = None
+        self._set_dead(set())
+        for rows in _chunks(self._db.execute("SELECT vec_id, emb FROM passages ORDER BY vec_id"),
+                            self.chunk_size):
+            ids  = np.array([r[0] for r in rows], dtype=np.int64)
+            embs = np.stack([np.frombuffer(r[1], dtype=np.float16) for r in rows]).astype(np.float32)
+            self._add_vectors(ids, embs)
+        self._flush_pending()
+
+    def _add_vectors(self, ids, embs):
+        """Add to the index; until an IVF/PQ index is trained, buffer up to train_size."""
+        if self.index is not None and self.index.is_trained:
+            self.index.add_with_ids(embs, ids)
+            return
+        self._pending.append((ids, embs))
+        if sum(len(i) for i, _ in self._pending) >= self.train_size:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        """Create/train the index on the buffered vectors and add them."""
+        ids  = np.concatenate([i for i, _ in self._pending]) if self._pending else np.zeros(0, np.int64)
+        embs = np.concatenate([e for _, e in self._pending]) if self._pending else np.zeros((0, self.dim), np.float32)
+        self._pending = []
+        if self.index is None:
+            self.index = self._new_index(len(ids))
+            self._set_search_params()
+        if not self.index.is_trained:
+            if not len(ids):
+                self.index = None   # nothing to train on yet
+                return
+            t0 = time.monotonic()
+            self.index.train(embs)
+            print(f"[KnowledgeBase] Trained on {len(ids)} vectors in {time.monotonic() - t0:.1f}s")
+        if len(ids):
+            self.index.add_with_ids(embs, ids)
+
+    def _remove_vectors(self, vec_ids):
+        """Drop vectors; HNSW can't, so its dead vectors are excluded at search time."""
+        if not vec_ids or self.index is None:
+            return
+        try:
+            self.index.remove_ids(np.array(vec_ids, dtype=np.int64))
+        except RuntimeError:
+            self._set_dead(self._dead | set(vec_ids))
+
+    def _save(self):
+        if self._pending:
+            self._flush_pending()
+        self._live = self._count()
+        if self.index is not None:
+            tmp = INDEX_PATH.with_name(INDEX_PATH.name + '.tmp')
+            faiss.write_index(self.index, str(tmp))
+            os.replace(tmp, INDEX_PATH)
+        elif INDEX_PATH.exists():
+            INDEX_PATH.unlink()
+        self.manifest.update(config=self.config, dim=self.dim,
+                             ntotal=self.index.ntotal if self.index is not None else 0)
+        MANIFEST_PATH.write_text(json.dumps(self.manifest, indent=2))
+
+    # -- store -----------------------------------------------------------------
+
+    def _count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM passages").fetchone()[0]
+
+    def _clear_store(self):
+        self._db.execute("DELETE FROM passages")
+        self._db.commit()
+        self.manifest['sources'] = {}
+
+    def encode(self, texts):
+        """Normalised embeddings, one row per text."""
+        return self.model.encode(texts, batch_size=self.batch_size,
+                                 convert_to_numpy=True, normalize_embeddings=True)
+
+    def _ingest(self, passages, source: str, seen: set) -> tuple:
+        """Store and index one chunk; returns (added, updated)."""
+        rows = {}
+        for p in passages:
+            pid = str(p['id'])
+            seen.add(pid)
+            rows[pid] = (p, hashlib.sha1(json.dumps(p, sort_keys=True).encode('utf-8')).hexdigest())
+        old = {}
+        pids = list(rows)
+        for i in range(0, len(pids), 500):
+            part = pids[i:i + 500]
+            old.update((pid, (vec_id, h)) for vec_id, pid, h in self._db.execute(
+                f"SELECT vec_id, pid, hash FROM passages WHERE pid IN ({','.join('?' * len(part))})", part))
+        todo = [pid for pid in pids if pid not in old or old[pid][1] != rows[pid][1]]
+        if not todo:
+            return 0, 0
+        embs = self.encode([rows[pid][0]['text'] for pid in todo]).astype(np.float32)
+        stale = [old[pid][0] for pid in todo if pid in old]
+        self._db.executemany("DELETE FROM passages WHERE vec_id = ?", [(v,) for v in stale])
+        new_ids = []
+        for pid, emb in zip(todo, embs):
+            p, h = rows[pid]
+            cur = self._db.execute(
+                "INSERT INTO passages (pid, source, hash, data, emb) VALUES (?, ?, ?, ?, ?)",
+                (pid, source, h, json.dumps(p), emb.astype(np.float16).tobytes()))
+            new_ids.append(cur.lastrowid)
+        self._remove_vectors(stale)
+        self._add_vectors(np.array(new_ids, dtype=np.int64), embs)
+        return len(todo) - len(stale), len(stale)
+
+    def _remove_where(self, where: str, args) -> int:
+        vec_ids = [r[0] for r in self._db.execute(f"SELECT vec_id FROM passages WHERE {where}", args)]
+        self._db.executemany("DELETE FROM passages WHERE vec_id = ?", [(v,) for v in vec_ids])
+        self._remove_vectors(vec_ids)
+        return len(vec_ids)
+
+    # -- public API --------------------------------------------------------------
+
+    def sync(self) -> dict:
+        """Ingest new/changed source files and drop removed ones; returns counts."""
+        counts = {'files': 0, 'added': 0, 'updated': 0, 'removed': 0}
+        t0 = time.monotonic()
+        with self._lock:
+            known   = self.manifest.setdefault('sources', {})
+            present = [p for p in self.sources if p.exists()]
+            for path in present:
+                key = str(path)
+                st  = path.stat()
+                sig = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+                entry = known.get(key, {})
+                if {k: entry.get(k) for k in sig} == sig:
+                    continue
+                digest = _sha256(path)
+                if entry.get('sha256') == digest:
+                    entry.update(sig)   # touched, not changed
+                    continue
+                print(f"[KnowledgeBase] Ingesting {path.name}...")
+                seen = set()
+                for chunk in _chunks(iter_passages(path), self.chunk_size):
+                    added, updated = self._ingest(chunk, key, seen)
+                    counts['added'] += added
+                    counts['updated'] += updated
+                    self._db.commit()
+                # Passages no longer in the file
+                gone = [pid for (pid,) in self._db.execute(
+                    "SELECT pid FROM passages WHERE source = ?", (key,)) if pid not in seen]
+                for i in range(0, len(gone), 500):
+                    part = gone[i:i + 500]
+                    counts['removed'] += self._remove_where(
+                        f"pid IN ({','.join('?' * len(part))})", part)
+                known[key] = dict(sig, sha256=digest, passages=len(seen))
+                counts['files'] += 1
+            for key in [k for k in known if Path(k) not in present]:
+                counts['removed'] += self._remove_where("source = ?", (key,))
+                del known[key]
+                counts['files'] += 1
+            self._db.commit()
+            if counts['files']:
+                self._compact_if_needed()
+                self._save()
+                self.changed = self.changed or any(counts[k] for k in ('added', 'updated', 'removed'))
+                print(f"[KnowledgeBase] Synced {counts['files']} files in {time.monotonic() - t0:.1f}s: "
+                      f"{counts['added']} added, {counts['updated']} updated, {counts['removed']} removed")
+        return counts
+
+    def add_passages(self, passages, source: str = 'api'):
+        """Add or update passages by id outside any source file."""
+        with self._lock:
+            added, updated = 0, 0
+            for chunk in _chunks(passages, self.chunk_size):
+                a, u = self._ingest(chunk, source, set())
+                added, updated = added + a, updated + u
+            self._db.commit()
+            self._flush_pending()
+            self._save()
+            self.changed = True
+        return {'added': added, 'updated': updated}
+
+    def remove_passages(self, ids) -> int:
+        """Remove passages by id."""
+        ids = [str(i) for i in ids]
+        with self._lock:
+            removed = 0
+            for i in range(0, len(ids), 500):
+                part = ids[i:i + 500]
+                removed += self._remove_where(f"pid IN ({','.join('?' * len(part))})", part)
+            self._db.commit()
+            self._compact_if_needed()
+            self._save()
+            self.changed = True
+        return removed
+
+    def _compact_if_needed(self):
+        """Rebuild when dead vectors pile up, or retrain once the corpus outgrew the training set."""
+        if self._pending:
+            self._flush_pending()
+        if self.index is None:
+            return
+        live = self._count()
+        dead = self.index.ntotal - live
+        trained_on = self.manifest.get('trained_on')
+        if dead and dead > COMPACT_RATIO * self.index.ntotal:
+            print(f"[KnowledgeBase] Compacting index ({dead} dead vectors)")
+            self._rebuild_from_store()
+        elif trained_on is not None and trained_on < self.train_size and live >= 4 * trained_on:
+            print(f"[KnowledgeBase] Retraining: trained on {trained_on}, now {live} passages")
+            self._rebuild_from_store()
+
+    def rebuild(self):
+        """Rebuild (and retrain) the index from the stored embeddings."""
+        with self._lock:
+            self._rebuild_from_store()
+            self._save()
+
+    def retrieve(self, query: str, top_k: int = 3, q_emb=None):
+        """
+        :param q_emb: The query's embedding from encode(), if already computed
+        """
+        if q_emb is None:
+            q_emb = self.encode([query])
+        with self._lock:
+            if self.index is None or not self.index.ntotal:
+                return []
+            k = min(self.index.ntotal, top_k)
+            D, I  = self.index.search(np.asarray(q_emb, dtype=np.float32), k,
+                                      params=self._search_params())
+            ids = [int(i) for i in I[0] if i >= 0]
+            if not ids:
+                return []
+            found = dict(self._db.execute(
+                f"SELECT vec_id, data FROM passages WHERE vec_id IN ({','.join('?' * len(ids))})", ids))
+        return [json.loads(found[i]) for i in ids if i in found][:top_k]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'passages': self._live,
+                    'vectors':  self.index.ntotal if self.index is not None else 0,
+                    'config':   self.config,
+                    'sources':  len(self.manifest.get('sources', {}))}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ingest passage files into the knowledge base")
+    parser.add_argument('sources', nargs='*', help="passage files (.json / .jsonl); "
+                                                   "default sample_passages.json + corpus/")
+    parser.add_argument('--index', default=os.getenv("R2_KB_INDEX", FLAT), choices=(FLAT, IVF, HNSW))
+    parser.add_argument('--pq', type=int, default=int(os.getenv("R2_KB_PQ", "0")))
+    parser.add_argument('--nlist', type=int, default=int(os.getenv("R2_KB_NLIST", "1024")))
+    parser.add_argument('--rebuild', action='store_true', help="retrain the index from stored embeddings")
+    args = parser.parse_args()
+
+    kb = KnowledgeBase(index_type=args.index, pq=args.pq, nlist=args.nlist,
+                       sources=args.sources or None)
+    if args.rebuild:
+        kb.rebuild()
+    print(json.dumps(kb.stats(), indent=2))
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+TimerService:
+  One shared timing thread for every manager’s auto-reset / auto-revert /
+  attention deadlines. Deadlines live in a heap on time.monotonic(); the worker
+  sleeps on a condition variable until the earliest one is due.
+  Callbacks run on the worker thread, so keep them short.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+class TimerHandle:
+    """Returned by TimerService.schedule(); call cancel() to drop the deadline."""
+
+    def __init__(self, service, deadline, callback, args):
+        self._service  = service
+        self.deadline  = deadline
+        self.callback  = callback
+        self.args      = args
+        self.cancelled = False
+        self.fired     = False
+
+    @property
+    def active(self) -> bool:
+        """True while the deadline is still pending."""
+        return not (self.cancelled or self.fired)
+
+    def remaining(self) -> float:
+        """Seconds until the deadline (0 once due)."""
+        return max(0.0, self.deadline - time.monotonic())
+
+    def cancel(self) -> bool:
+        """Cancel the timer; False if it already fired or was cancelled."""
+        return self._service.cancel(self)
+
+
+class TimerService:
+    def __init__(self):
+        self._heap = []   # (deadline, seq, handle)
+        self._seq  = itertools.count()
+        self._cond = threading.Condition()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def schedule(self, delay: float, callback, *args) -> TimerHandle:
+        """Run callback(*args) after `delay` seconds."""
+        return self.schedule_at(time.monotonic() + delay, callback, *args)
+
+    def schedule_at(self, deadline: float, callback, *args) -> TimerHandle:
+        """Run callback(*args) at the absolute time.monotonic() `deadline`."""
+        handle = TimerHandle(self, deadline, callback, args)
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, next(self._seq), handle))
+            # Only wake the worker if this is the new earliest deadline
+            if self._heap[0][2] is handle:
+                self._cond.notify()
+        return handle
+
+    def cancel(self, handle: TimerHandle) -> bool:
+        with self._cond:
+            if not handle.active:
+                return False
+            # Lazily removed when it reaches the top of the heap
+            handle.cancelled = True
+            return True
+
+    def pending(self) -> int:
+        """Number of timers still waiting to fire."""
+        with self._cond:
+            return sum(1 for _, _, h in self._heap if h.active)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    while self._heap and self._heap[0][2].cancelled:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    timeout = self._heap[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                _, _, handle = heapq.heappop(self._heap)
+                handle.fired = True
+
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                print(f"[TimerService] Timer callback error: {e}")
+
+
+_default_service = None
+_default_lock    = threading.Lock()
+
+def default_timer_service() -> TimerService:
+    """Process-wide TimerService used when a manager isn't given one."""
+    global _default_service
+    with _default_lock:
+        if _default_service is None:
+            _default_service = TimerService()
+        return _default_service